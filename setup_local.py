@@ -60,14 +60,13 @@ def setup_environment():
     
     # Vérifier que les modules sont importables
     try:
-        # Ajouter les chemins nécessaires
-        src_path = Path("src").absolute()
-        root_path = Path(".").absolute()
-        sys.path.insert(0, str(src_path))
-        sys.path.insert(0, str(root_path))
+        # Import en tant que paquet, comme à l'exécution (python -m src): seule la racine est nécessaire
+        root_path = str(Path(".").absolute())
+        if root_path not in sys.path:
+            sys.path.insert(0, root_path)
         
         # Test d'import simple
-        import scrapers
+        import src.scrapers
         print("✅ Modules scrapers importables")
         return True
     except ImportError as e:
@@ -7,11 +7,14 @@ avec suivi automatique des prix, stocks et tendances.
 from __future__ import annotations
 
 import asyncio
+from contextlib import AsyncExitStack
 from datetime import datetime
 from typing import Dict, List, Any
 from collections import defaultdict
+from operator import methodcaller
 
 from apify import Actor
+from httpx import AsyncClient, Limits
 
 from src.scrapers import (
     AmazonScraper,
@@ -30,6 +33,19 @@ from src.scrapers.multi_platform_playwright_scraper import MultiPlatformPlaywrig
 from src.utils import safe_log
 
 
+# Nombre de produits envoyés au Dataset Apify par appel à push_data
+PUSH_BATCH_SIZE = 1000
+
+# Conversion Product -> dict appliquée en lot lors de la compilation des résultats
+TO_DICT = methodcaller('to_dict')
+
+# Nombre de plateformes scrapées simultanément pour un même terme
+MAX_CONCURRENT_PLATFORMS = 3
+
+# Pool de connexions HTTP/2 partagé par les scrapers traditionnels
+HTTP_LIMITS = Limits(max_connections=50, max_keepalive_connections=20)
+
+
 async def retry_on_error(func, *args, max_retries: int = 20, delay: float = 1.0, **kwargs):
     """Fonction de retry qui tente une opération jusqu'à 20 fois en cas d'erreur.
     
@@ -46,8 +62,6 @@ async def retry_on_error(func, *args, max_retries: int = 20, delay: float = 1.0,
     Raises:
         Exception: La dernière exception si toutes les tentatives échouent
     """
-    import asyncio
-    
     last_exception = None
     
     for attempt in range(1, max_retries + 1):
@@ -92,7 +106,12 @@ class EcommerceScraper:
         self.headless = config.get('headless', True)  # Mode headless pour Playwright
         
         self.scrapers = {}
+        self.http_client = None
+        # Résultats non vides déjà obtenus par (plateforme, terme): une plateforme qui a atteint son minimum
+        # ne relance pas ces recherches, elles ne rapporteraient que des doublons
+        self._result_cache: Dict[tuple, list] = {}
         self.results = defaultdict(list)
+        self._platform_semaphore = asyncio.Semaphore(config.get('maxConcurrency', MAX_CONCURRENT_PLATFORMS))
         
     async def initialize_scrapers(self):
         """Initialise les scrapers pour chaque plateforme sélectionnée."""
@@ -118,21 +137,25 @@ class EcommerceScraper:
             # Utilisation des scrapers traditionnels
             await safe_log('info', 'Utilisation des scrapers traditionnels')
             
+            # Un seul client HTTP/2 pour toutes les plateformes: connexions et TLS réutilisés
+            self.http_client = AsyncClient(http2=True, limits=HTTP_LIMITS, timeout=30.0, follow_redirects=True)
+            
             if 'amazon' in self.platforms:
-                self.scrapers['amazon'] = AmazonScraper(max_results=max_per_platform)
+                self.scrapers['amazon'] = AmazonScraper(max_results=max_per_platform, session=self.http_client)
                 
             if 'ebay' in self.platforms:
-                self.scrapers['ebay'] = EbayScraper(max_results=max_per_platform)
+                self.scrapers['ebay'] = EbayScraper(max_results=max_per_platform, session=self.http_client)
                 
             if 'walmart' in self.platforms:
-                self.scrapers['walmart'] = WalmartScraper(max_results=max_per_platform)
+                self.scrapers['walmart'] = WalmartScraper(max_results=max_per_platform, session=self.http_client)
                 
             if 'etsy' in self.platforms:
-                self.scrapers['etsy'] = EtsyScraper(max_results=max_per_platform)
+                self.scrapers['etsy'] = EtsyScraper(max_results=max_per_platform, session=self.http_client)
                 
             if 'shopify' in self.platforms:
                 domains = self.shopify_domains if self.shopify_domains else ['shopify.com']
-                self.scrapers['shopify'] = ShopifyScraper(max_results=max_per_platform, domains=domains)
+                self.scrapers['shopify'] = ShopifyScraper(max_results=max_per_platform, domains=domains,
+                                                          session=self.http_client)
     
     async def scrape_all_platforms(self) -> List[Dict[str, Any]]:
         """Lance le scraping sur toutes les plateformes avec retry intelligent jusqu'à obtenir 50 produits."""
@@ -145,46 +168,48 @@ class EcommerceScraper:
         
         await safe_log('info', f'Objectif: {target_total} produits au total, minimum {min_per_platform} par plateforme')
         
-        while attempt < max_attempts:
-            attempt += 1
-            await safe_log('info', f'Tentative {attempt}/{max_attempts}')
-            
-            # Vérifier si on a atteint l'objectif
-            total_products = sum(len(products) for products in platform_products.values())
-            platforms_with_min = sum(1 for products in platform_products.values() if len(products) >= min_per_platform)
+        # Chaque scraper (session HTTP ou navigateur) est ouvert une fois pour toutes les tentatives
+        async with AsyncExitStack() as stack:
+            # Le client partagé est fermé après tous les scrapers qui l'utilisent
+            if self.http_client is not None:
+                await stack.enter_async_context(self.http_client)
+            for scraper in self.scrapers.values():
+                await stack.enter_async_context(scraper)
             
-            if total_products >= target_total and platforms_with_min == len(self.scrapers):
-                await safe_log('info', f'Objectif atteint: {total_products} produits trouvés avec au moins {min_per_platform} par plateforme')
-                break
-            
-            # Identifier les plateformes qui ont besoin de plus de produits
-            platforms_to_scrape = []
-            for platform in self.scrapers.keys():
-                current_count = len(platform_products[platform])
-                if current_count < min_per_platform or total_products < target_total:
-                    platforms_to_scrape.append(platform)
-            
-            if not platforms_to_scrape:
-                break
-            
-            await safe_log('info', f'Scraping des plateformes: {", ".join(platforms_to_scrape)}')
-            
-            # Scraper les plateformes qui ont besoin de plus de produits
-            for search_term in self.search_terms:
-                await safe_log('info', f'Recherche pour le terme: {search_term}')
+            while attempt < max_attempts:
+                attempt += 1
+                await safe_log('info', f'Tentative {attempt}/{max_attempts}')
+                
+                # Vérifier si on a atteint l'objectif
+                total_products = sum(len(products) for products in platform_products.values())
+                
+                if self._objective_reached(platform_products, target_total, min_per_platform):
+                    await safe_log('info', f'Objectif atteint: {total_products} produits trouvés avec au moins {min_per_platform} par plateforme')
+                    break
+                
+                # Identifier les couples (plateforme, terme) qui peuvent encore apporter des produits
+                tasks = self._pending_pairs(platform_products, target_total, min_per_platform)
                 
-                # Lancer le scraping en parallèle sur les plateformes sélectionnées
-                tasks = []
-                for platform in platforms_to_scrape:
-                    if platform in self.scrapers:
-                        scraper = self.scrapers[platform]
-                        task = self._scrape_platform(platform, scraper, search_term)
-                        tasks.append((platform, task))
+                if not tasks:
+                    await safe_log('info', 'Aucune recherche restante: les résultats des plateformes à compléter sont déjà en cache')
+                    break
                 
-                # Attendre que tous les scrapers terminent
-                for platform, task in tasks:
+                platforms_to_scrape = list(dict.fromkeys(platform for platform, _ in tasks))
+                await safe_log('info', f'Scraping des plateformes: {", ".join(platforms_to_scrape)}')
+                
+                # Scraper en parallèle chaque couple (plateforme, terme); le sémaphore borne la concurrence
+                await safe_log('info', f'Recherche pour les termes: {", ".join(dict.fromkeys(term for _, term in tasks))}')
+                results = await asyncio.gather(
+                    *(self._scrape_platform(platform, self.scrapers[platform], search_term) for platform, search_term in tasks),
+                    return_exceptions=True
+                )
+                
+                # Traiter les résultats une fois tous les scrapers terminés
+                for (platform, search_term), result in zip(tasks, results):
+                    if isinstance(result, Exception):
+                        await safe_log('error', f'Erreur sur {platform} pour "{search_term}": {str(result)}')
+                        continue
                     try:
-                        result = await task
                         if result:
                             # Éviter les doublons en vérifiant les URLs
                             existing_urls = set()
@@ -215,15 +240,17 @@ class EcommerceScraper:
                                 await safe_log('info', f'{platform}: +{len(new_products)} nouveaux produits (total: {len(platform_products[platform])})')
                     except Exception as e:
                         await safe_log('error', f'Erreur sur {platform}: {str(e)}')
-            
-            # Attendre un peu avant la prochaine tentative
-            if attempt < max_attempts:
-                await asyncio.sleep(2)
+                
+                # Attendre un peu avant la prochaine tentative, sauf si l'objectif est atteint ou qu'il n'y a plus rien à lancer
+                if (attempt < max_attempts
+                        and not self._objective_reached(platform_products, target_total, min_per_platform)
+                        and self._pending_pairs(platform_products, target_total, min_per_platform)):
+                    await asyncio.sleep(2)
         
         # Compiler tous les produits
         for platform, products in platform_products.items():
             self.results[platform] = products
-            all_products.extend([product.to_dict() for product in products])
+            all_products.extend(map(TO_DICT, products))
         
         total_found = len(all_products)
         await safe_log('info', f'Scraping terminé après {attempt} tentatives: {total_found} produits trouvés')
@@ -236,17 +263,51 @@ class EcommerceScraper:
         
         return all_products
     
+    async def close(self) -> None:
+        """Ferme le client HTTP partagé s'il est encore ouvert (les scrapers sont fermés par scrape_all_platforms)."""
+        if self.http_client is not None and not self.http_client.is_closed:
+            await self.http_client.aclose()
+    
+    def _objective_reached(self, platform_products: Dict[str, list], target_total: int, min_per_platform: int) -> bool:
+        """Indique si le total visé est atteint avec le minimum requis sur chaque plateforme."""
+        total_products = sum(len(products) for products in platform_products.values())
+        platforms_with_min = sum(1 for products in platform_products.values() if len(products) >= min_per_platform)
+        return total_products >= target_total and platforms_with_min == len(self.scrapers)
+    
+    def _pending_pairs(self, platform_products: Dict[str, list], target_total: int,
+                       min_per_platform: int) -> List[tuple]:
+        """Retourne les couples (plateforme, terme) à scraper au prochain tour.
+        
+        Une plateforme sous le minimum est toujours retentée, sans passer par le cache; une plateforme
+        qui l'a atteint ne relance que les termes sans résultat en cache.
+        """
+        total_products = sum(len(products) for products in platform_products.values())
+        pairs = []
+        for platform in self.scrapers:
+            below_min = len(platform_products[platform]) < min_per_platform
+            if not below_min and total_products >= target_total:
+                continue
+            for search_term in self.search_terms:
+                if below_min or (platform, search_term) not in self._result_cache:
+                    pairs.append((platform, search_term))
+        return pairs
+    
     async def _scrape_platform(self, platform: str, scraper, search_term: str) -> list:
         """Scrape une plateforme spécifique avec gestion d'erreurs et retry automatique."""
+        cache_key = (platform, search_term)
+        
         async def scrape_with_context():
-            async with scraper:
-                products = await scraper.search_products(search_term)
-                await safe_log('info', f'{platform}: {len(products)} produits trouvés pour "{search_term}"')
-                return products
+            products = await scraper.search_products(search_term)
+            await safe_log('info', f'{platform}: {len(products)} produits trouvés pour "{search_term}"')
+            return products
         
         try:
-            # Utilisation du système de retry pour plus de robustesse
-            return await retry_on_error(scrape_with_context, max_retries=20, delay=2.0)
+            # Utilisation du système de retry pour plus de robustesse, dans la limite des plateformes simultanées
+            async with self._platform_semaphore:
+                products = await retry_on_error(scrape_with_context, max_retries=20, delay=2.0)
+            if products:
+                self._result_cache[cache_key] = products
+            return products
         except Exception as e:
             await safe_log('error', f'Échec définitif du scraping {platform} après 20 tentatives: {str(e)}')
             return []
@@ -401,12 +462,16 @@ async def main() -> None:
         
         # Initialisation du scraper
         scraper = EcommerceScraper(actor_input)
-        await scraper.initialize_scrapers()
-        
-        await safe_log('info', f'Scrapers initialisés pour: {", ".join(scraper.platforms)}')
-        
-        # Lancement du scraping
-        products = await scraper.scrape_all_platforms()
+        try:
+            await scraper.initialize_scrapers()
+            
+            await safe_log('info', f'Scrapers initialisés pour: {", ".join(scraper.platforms)}')
+            
+            # Lancement du scraping
+            products = await scraper.scrape_all_platforms()
+        finally:
+            # Libère le client HTTP partagé même si le scraping n'a pas pu démarrer
+            await scraper.close()
         
         # Génération du rapport
         report = await scraper.generate_report(products)
@@ -416,6 +481,6 @@ async def main() -> None:
         # Sauvegarde des résultats
         await Actor.push_data(report)
         
-        # Sauvegarde des produits individuels pour faciliter l'analyse
-        for product in products:
-            await Actor.push_data(product)
+        # Sauvegarde des produits individuels par lots pour faciliter l'analyse
+        for start in range(0, len(products), PUSH_BATCH_SIZE):
+            await Actor.push_data(products[start:start + PUSH_BATCH_SIZE])
@@ -2,23 +2,72 @@
 
 import asyncio
 import random
-from typing import List, Optional, Dict, Any
+import re
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
 from urllib.parse import quote_plus, urljoin
-from bs4 import BeautifulSoup
+import soupsieve as sv
+from bs4 import BeautifulSoup, Tag
 from apify import Actor
 from playwright.async_api import Page
 
 from src.scrapers.playwright_scraper import PlaywrightScraper
 from src.scrapers.base_scraper import Product
-from src.utils import safe_log
+from src.utils import safe_log, LogFunc
+
+
+# Indicateurs de blocage ou de CAPTCHA, recherchés en un seul passage sur la page
+BLOCKED_RE = re.compile(
+    '|'.join(map(re.escape, (
+        'captcha',
+        'robot',
+        'automated',
+        'blocked',
+        'access denied',
+        'sorry, something went wrong'
+    ))),
+    re.IGNORECASE
+)
+
+# Sélecteurs CSS compilés une seule fois; titre et prix par ordre de priorité
+TITLE_SELECTORS = tuple(map(sv.compile, (
+    'h2 a span',
+    'h2 span',
+    '.s-title-instructions-style h2 a span',
+    '[data-cy="title-recipe-title"]',
+    '.s-link-style a span'
+)))
+
+PRICE_SELECTORS = tuple(map(sv.compile, (
+    '.a-price-whole',
+    '.a-price .a-offscreen',
+    '.a-price-range .a-offscreen',
+    '[data-cy="price-recipe"]'
+)))
+
+LINK_SELECTOR = sv.compile('h2 a, .s-link-style a')
+IMAGE_SELECTOR = sv.compile('img')
+RATING_SELECTOR = sv.compile('.a-icon-alt, [aria-label*="stars"]')
+REVIEWS_SELECTOR = sv.compile('.a-size-base, [aria-label*="reviews"]')
+
+# Sélecteurs de la fiche produit, construits une seule fois pour toutes les pages
+DETAIL_PRICE_SELECTORS = ('.a-price .a-offscreen', '.a-price-whole', '#price_inside_buybox')
+
+# Éléments de CAPTCHA, regroupés en un seul sélecteur pour un unique aller-retour vers la page
+CAPTCHA_SELECTOR = ', '.join((
+    '[name="captcha"]',
+    '#captchacharacters',
+    '.captcha-container',
+    '[data-testid="captcha"]'
+))
 
 
 class AmazonPlaywrightScraper(PlaywrightScraper):
     """Scraper Amazon utilisant Playwright avec Chromium pour contourner les détections."""
     
-    def __init__(self, max_results: int = 50, domain: str = 'amazon.com', headless: bool = True):
-        super().__init__(max_results, headless, use_stealth=True)
+    def __init__(self, max_results: int = 50, domain: str = 'amazon.com', headless: bool = True,
+                 logger: LogFunc = safe_log):
+        super().__init__(max_results, headless, use_stealth=True, logger=logger)
         self.domain = domain
         self.base_url = f'https://www.{domain}'
         
@@ -57,106 +106,90 @@ class AmazonPlaywrightScraper(PlaywrightScraper):
     async def search_products(self, search_term: str) -> List[Product]:
         """Recherche des produits sur Amazon en utilisant Playwright."""
         products = []
+        # Hors d'un bloc async with, le navigateur est lancé puis fermé pour cette seule recherche
+        owns_browser = self.browser is None
         
         try:
-            await safe_log("info", f"Démarrage de la recherche Amazon Playwright pour: {search_term}")
+            await self._log("info", f"Démarrage de la recherche Amazon Playwright pour: {search_term}")
             
             # Initialisation du navigateur si nécessaire
-            if not self.browser:
+            if owns_browser:
                 await self.init_browser()
             
-            # Création d'une nouvelle page
-            page = await self.create_page()
-            
-            # Configuration des headers spécifiques à Amazon
-            await page.set_extra_http_headers(self.amazon_headers)
-            
-            # Tentative avec différents endpoints
-            for endpoint in self.search_endpoints:
+            # Page prise dans le pool et toujours rendue, même en cas d'erreur
+            async with self._page_sem:
+                page = await self.acquire_page()
                 try:
-                    search_url = self.base_url + endpoint.format(quote_plus(search_term))
-                    await safe_log("info", f"Tentative avec URL: {search_url}")
+                    # Configuration des headers spécifiques à Amazon
+                    await page.set_extra_http_headers(self.amazon_headers)
                     
-                    # Navigation avec retry
-                    if await self.navigate_with_retry(page, search_url):
-                        # Vérification si on est bloqué
-                        if await self._check_if_blocked(page):
-                            await safe_log("warning", "Détection de blocage Amazon, tentative de contournement...")
-                            await self._handle_amazon_captcha(page)
+                    # Tentative avec différents endpoints
+                    for attempt, endpoint in enumerate(self.search_endpoints):
+                        try:
+                            # Délai entre les tentatives, uniquement avant un nouvel endpoint
+                            if attempt:
+                                await asyncio.sleep(random.uniform(2, 4))
+                            
+                            search_url = self.base_url + endpoint.format(quote_plus(search_term))
+                            await self._log("info", f"Tentative avec URL: {search_url}")
+                            
+                            # Navigation avec retry
+                            if await self.navigate_with_retry(page, search_url,
+                                                              ready_selector=', '.join(self.product_selectors)):
+                                # HTML sérialisé une seule fois: sert au contrôle de blocage et à l'extraction
+                                html = await page.content()
+                                
+                                # Vérification si on est bloqué
+                                if await self._check_if_blocked(page, html):
+                                    await self._log("warning", "Détection de blocage Amazon, tentative de contournement...")
+                                    await self._handle_amazon_captcha(page)
+                                    continue
+                                
+                                # Extraction des produits
+                                page_products = await self._extract_amazon_products(html)
+                                products.extend(page_products)
+                                
+                                if products:
+                                    await self._log("info", f"Trouvé {len(products)} produits avec l'endpoint {endpoint}")
+                                    break
+                            
+                        except Exception as e:
+                            await self._log("error", f"Erreur avec l'endpoint {endpoint}: {e}")
                             continue
-                        
-                        # Extraction des produits
-                        page_products = await self._extract_amazon_products(page)
-                        products.extend(page_products)
-                        
-                        if products:
-                            await safe_log("info", f"Trouvé {len(products)} produits avec l'endpoint {endpoint}")
-                            break
-                    
-                    # Délai entre les tentatives
-                    await asyncio.sleep(random.uniform(2, 4))
-                    
-                except Exception as e:
-                    await safe_log("error", f"Erreur avec l'endpoint {endpoint}: {e}")
-                    continue
-            
-            await page.close()
+                finally:
+                    await self.release_page(page)
             
         except Exception as e:
-            await safe_log("error", f"Erreur lors de la recherche Amazon: {e}")
+            await self._log("error", f"Erreur lors de la recherche Amazon: {e}")
         
         finally:
             # Nettoyage
-            try:
+            if owns_browser:
                 await self.close()
-            except:
-                pass
         
-        await safe_log("info", f"Recherche Amazon terminée. {len(products)} produits trouvés.")
+        await self._log("info", f"Recherche Amazon terminée. {len(products)} produits trouvés.")
         return products[:self.max_results]
     
-    async def _check_if_blocked(self, page: Page) -> bool:
-        """Vérifie si la page indique un blocage ou un CAPTCHA."""
+    async def _check_if_blocked(self, page: Page, html: Optional[str] = None) -> bool:
+        """Vérifie si la page indique un blocage ou un CAPTCHA (`html`: contenu déjà récupéré, si disponible)."""
         try:
             # Vérification des indicateurs de blocage
-            blocked_indicators = [
-                'captcha',
-                'robot',
-                'automated',
-                'blocked',
-                'access denied',
-                'sorry, something went wrong'
-            ]
-            
-            page_content = await page.content()
-            page_text = page_content.lower()
-            
-            for indicator in blocked_indicators:
-                if indicator in page_text:
-                    return True
+            if html is None:
+                html = await page.content()
+            if BLOCKED_RE.search(html):
+                return True
             
             # Vérification des sélecteurs de CAPTCHA
-            captcha_selectors = [
-                '[name="captcha"]',
-                '#captchacharacters',
-                '.captcha-container',
-                '[data-testid="captcha"]'
-            ]
-            
-            for selector in captcha_selectors:
-                if await page.query_selector(selector):
-                    return True
-            
-            return False
+            return await page.query_selector(CAPTCHA_SELECTOR) is not None
             
         except Exception as e:
-            await safe_log("error", f"Erreur lors de la vérification de blocage: {e}")
+            await self._log("error", f"Erreur lors de la vérification de blocage: {e}")
             return False
     
     async def _handle_amazon_captcha(self, page: Page) -> bool:
         """Tente de gérer les CAPTCHAs Amazon (basique)."""
         try:
-            await safe_log("info", "Tentative de gestion du CAPTCHA Amazon...")
+            await self._log("info", "Tentative de gestion du CAPTCHA Amazon...")
             
             # Attendre un peu pour voir si le CAPTCHA se résout automatiquement
             await asyncio.sleep(random.uniform(5, 10))
@@ -168,160 +201,137 @@ class AmazonPlaywrightScraper(PlaywrightScraper):
             return not await self._check_if_blocked(page)
             
         except Exception as e:
-            await safe_log("error", f"Erreur lors de la gestion du CAPTCHA: {e}")
+            await self._log("error", f"Erreur lors de la gestion du CAPTCHA: {e}")
             return False
     
-    async def _extract_amazon_products(self, page: Page) -> List[Product]:
-        """Extrait les produits Amazon de la page."""
+    async def _extract_amazon_products(self, html: str) -> List[Product]:
+        """Extrait les produits Amazon du HTML de la page de résultats."""
         products = []
         
         try:
-            # Attendre que les résultats se chargent
-            await page.wait_for_timeout(3000)
+            # Extraction locale avec lxml sur le HTML déjà transféré (aucun aller-retour par élément)
+            soup = BeautifulSoup(html, 'lxml')
+            scraped_at = datetime.now()  # Horodatage commun à tout le lot
             
             # Essayer différents sélecteurs
             for selector in self.product_selectors:
-                try:
-                    elements = await page.query_selector_all(selector)
-                    if elements:
-                        await safe_log("info", f"Trouvé {len(elements)} éléments avec le sélecteur {selector}")
-                        
-                        for element in elements[:self.max_results]:
-                            product = await self._extract_amazon_product_from_element(element)
-                            if product:
-                                products.append(product)
-                        
-                        if products:
-                            break  # Utiliser le premier sélecteur qui fonctionne
-                            
-                except Exception as e:
-                    await safe_log("error", f"Erreur avec le sélecteur Amazon {selector}: {e}")
-                    continue
+                elements = soup.select(selector)
+                if elements:
+                    await self._log("info", f"Trouvé {len(elements)} éléments avec le sélecteur {selector}")
+                    
+                    for element in elements[:self.max_results]:
+                        try:
+                            products.append(self._extract_amazon_product_from_element(element, scraped_at))
+                        except Exception as e:
+                            await self._log("error", f"Erreur lors de l'extraction du produit Amazon: {e}")
+                    
+                    if products:
+                        break  # Utiliser le premier sélecteur qui fonctionne
             
         except Exception as e:
-            await safe_log("error", f"Erreur lors de l'extraction des produits Amazon: {e}")
+            await self._log("error", f"Erreur lors de l'extraction des produits Amazon: {e}")
         
         return products
     
-    async def _extract_amazon_product_from_element(self, element) -> Optional[Product]:
-        """Extrait les informations d'un produit Amazon à partir d'un élément DOM."""
-        try:
-            # Extraction du titre
-            title_selectors = [
-                'h2 a span',
-                'h2 span',
-                '.s-title-instructions-style h2 a span',
-                '[data-cy="title-recipe-title"]',
-                '.s-link-style a span'
-            ]
-            
-            title = "Titre non trouvé"
-            for selector in title_selectors:
-                title_element = await element.query_selector(selector)
-                if title_element:
-                    title = await title_element.inner_text()
-                    if title and title.strip():
-                        break
-            
-            # Extraction du prix
-            price_selectors = [
-                '.a-price-whole',
-                '.a-price .a-offscreen',
-                '.a-price-range .a-offscreen',
-                '[data-cy="price-recipe"]'
-            ]
-            
-            price = "Prix non trouvé"
-            for selector in price_selectors:
-                price_element = await element.query_selector(selector)
-                if price_element:
-                    price = await price_element.inner_text()
-                    if price and price.strip():
-                        break
-            
-            # Extraction de l'URL
-            url = ""
-            link_element = await element.query_selector('h2 a, .s-link-style a')
-            if link_element:
-                href = await link_element.get_attribute('href')
-                if href:
-                    url = urljoin(self.base_url, href)
-            
-            # Extraction de l'image
-            image_url = ""
-            img_element = await element.query_selector('img')
-            if img_element:
-                src = await img_element.get_attribute('src')
-                if src:
-                    image_url = src
-            
-            # Extraction de la note
-            rating = ""
-            rating_element = await element.query_selector('.a-icon-alt, [aria-label*="stars"]')
-            if rating_element:
-                rating_text = await rating_element.get_attribute('aria-label')
-                if rating_text:
-                    rating = rating_text
-            
-            # Extraction du nombre d'avis
-            reviews_count = ""
-            reviews_element = await element.query_selector('.a-size-base, [aria-label*="reviews"]')
-            if reviews_element:
-                reviews_text = await reviews_element.inner_text()
-                if reviews_text and any(char.isdigit() for char in reviews_text):
-                    reviews_count = reviews_text
-            
-            # Extraction de l'ASIN
-            asin = ""
-            asin_attr = await element.get_attribute('data-asin')
-            if asin_attr:
-                asin = asin_attr
-            
-            # Nettoyage des données
-            title = title.strip()[:200] if title else "Titre non disponible"
-            price = price.strip() if price else "Prix non disponible"
-            rating = rating.strip() if rating else ""
-            reviews_count = reviews_count.strip() if reviews_count else ""
-            
-            return Product(
-                title=title,
-                price=price,
-                currency="USD",
-                url=url,
-                image_url=image_url,
-                rating=rating,
-                reviews_count=reviews_count,
-                asin=asin,
-                availability="En stock",
-                scraped_at=datetime.now()
-            )
-            
-        except Exception as e:
-            await safe_log("error", f"Erreur lors de l'extraction du produit Amazon: {e}")
-            return None
+    def _first_text(self, element: Tag, selectors: Tuple[sv.SoupSieve, ...]) -> str:
+        """Retourne le premier texte non vide parmi les sélecteurs, dans l'ordre de priorité."""
+        for selector in selectors:
+            found = selector.select_one(element)
+            if found:
+                text = found.get_text()
+                if text and text.strip():
+                    return text
+        return ""
+    
+    def _extract_amazon_product_from_element(self, element: Tag, scraped_at: datetime) -> Product:
+        """Extrait les informations d'un produit Amazon à partir d'un élément du HTML parsé."""
+        # Extraction du titre
+        title = self._first_text(element, TITLE_SELECTORS)
+        
+        # Extraction du prix
+        price = self._first_text(element, PRICE_SELECTORS)
+        
+        # Extraction de l'URL
+        url = ""
+        link_element = LINK_SELECTOR.select_one(element)
+        if link_element and link_element.get('href'):
+            url = urljoin(self.base_url, link_element['href'])
+        
+        # Extraction de l'image
+        img_element = IMAGE_SELECTOR.select_one(element)
+        image_url = (img_element.get('src') or "") if img_element else ""
+        
+        # Extraction de la note
+        rating_element = RATING_SELECTOR.select_one(element)
+        rating = (rating_element.get('aria-label') or "") if rating_element else ""
+        
+        # Extraction du nombre d'avis
+        reviews_count = ""
+        reviews_element = REVIEWS_SELECTOR.select_one(element)
+        if reviews_element:
+            reviews_text = reviews_element.get_text()
+            if any(char.isdigit() for char in reviews_text):
+                reviews_count = reviews_text
+        
+        # Extraction de l'ASIN
+        asin = element.get('data-asin') or ""
+        
+        # Nettoyage des données
+        title = title.strip()[:200] or "Titre non disponible"
+        price = price.strip() or "Prix non disponible"
+        
+        return Product(
+            title=title,
+            price=price,
+            currency="USD",
+            url=url,
+            image_url=image_url,
+            rating=rating.strip(),
+            reviews_count=reviews_count.strip(),
+            asin=asin,
+            availability="En stock",
+            platform="amazon",
+            scraped_at=scraped_at
+        )
     
     async def get_product_details(self, product_url: str) -> Optional[Dict[str, Any]]:
         """Récupère les détails complets d'un produit Amazon."""
+        cached = self.get_cached_details(product_url)
+        if cached is not None:
+            return cached
+        
         try:
             if not self.browser:
                 await self.init_browser()
             
-            page = await self.create_page()
-            await page.set_extra_http_headers(self.amazon_headers)
-            
-            if await self.navigate_with_retry(page, product_url):
-                # Extraction des détails complets
-                details = await self._extract_product_details(page)
-                await page.close()
-                return details
-            
-            await page.close()
-            return None
+            # Onglet pris dans le pool du contexte partagé, borné par le sémaphore de pages
+            async with self._page_sem:
+                page = await self.acquire_page()
+                try:
+                    await page.set_extra_http_headers(self.amazon_headers)
+                    
+                    if await self.navigate_with_retry(page, product_url, ready_selector='#productTitle'):
+                        # Extraction des détails complets
+                        details = await self._extract_product_details(page)
+                        self.cache_details(product_url, details)
+                        return details
+                    
+                    return None
+                finally:
+                    await self.release_page(page)
             
         except Exception as e:
-            await safe_log("error", f"Erreur lors de la récupération des détails: {e}")
+            await self._log("error", f"Erreur lors de la récupération des détails: {e}")
             return None
     
+    async def get_many_product_details(self, product_urls: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Récupère les détails de plusieurs produits en parallèle, un onglet par URL dans le même contexte."""
+        if not self.browser:
+            await self.init_browser()
+        
+        results = await asyncio.gather(*(self.get_product_details(url) for url in product_urls))
+        return dict(zip(product_urls, results))
+    
     async def _extract_product_details(self, page: Page) -> Dict[str, Any]:
         """Extrait les détails complets d'un produit Amazon."""
         details = {}
@@ -333,8 +343,7 @@ class AmazonPlaywrightScraper(PlaywrightScraper):
                 details['title'] = await title_element.inner_text()
             
             # Prix
-            price_selectors = ['.a-price .a-offscreen', '.a-price-whole', '#price_inside_buybox']
-            for selector in price_selectors:
+            for selector in DETAIL_PRICE_SELECTORS:
                 price_element = await page.query_selector(selector)
                 if price_element:
                     details['price'] = await price_element.inner_text()
@@ -366,6 +375,6 @@ class AmazonPlaywrightScraper(PlaywrightScraper):
                 details['seller'] = await seller_element.inner_text()
             
         except Exception as e:
-            await safe_log("error", f"Erreur lors de l'extraction des détails: {e}")
+            await self._log("error", f"Erreur lors de l'extraction des détails: {e}")
         
         return details
\ No newline at end of file
@@ -1,24 +1,63 @@
 """Scraper pour Amazon avec techniques anti-détection avancées."""
 
-import asyncio
 import random
+import re
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from urllib.parse import quote_plus, urljoin
+import soupsieve as sv
 from bs4 import BeautifulSoup
+from httpx import AsyncClient
 from apify import Actor
 
 from .base_scraper import BaseScraper, Product
 
 # Import de la fonction safe_log depuis utils
-from ..utils import safe_log
+from ..utils import safe_log, LogFunc, TokenBucket
+
+
+# Expressions régulières d'extraction, compilées une seule fois
+PRICE_RE = re.compile(r'[\d,]+\.?\d*')
+DECIMAL_RATING_RE = re.compile(r'(\d+\.\d+)')
+
+# Sélecteurs CSS compilés une seule fois, par ordre de priorité
+TITLE_SELECTORS = tuple(map(sv.compile, (
+    'h2 a span',
+    'h2 span',
+    '.s-size-mini span',
+    '[data-cy="title-recipe-title"]',
+    '.a-size-base-plus',
+    '.a-size-medium'
+)))
+PRICE_SELECTORS = tuple(map(sv.compile, (
+    '.a-price-whole',
+    '.a-price .a-offscreen',
+    '.a-price-range .a-offscreen',
+    '.a-price-symbol + .a-price-whole'
+)))
+URL_SELECTORS = tuple(map(sv.compile, (
+    'h2 a',
+    '.a-link-normal',
+    'a[href*="/dp/"]'
+)))
+IMAGE_SELECTOR = sv.compile('img')
+RATING_SELECTOR = sv.compile('.a-icon-alt')
+
+# Éléments recherchés sur une fiche produit, collectés en un seul parcours du DOM
+PRODUCT_DETAIL_TARGETS = {
+    'feature_bullets': lambda el: el.name == 'div' and el.get('id') == 'feature-bullets',
+    'product_description': lambda el: el.name == 'div' and el.get('id') == 'productDescription',
+    'byline': lambda el: el.name in ('span', 'a') and el.get('id') == 'bylineInfo',
+    'asin': lambda el: el.name == 'div' and el.has_attr('data-asin'),
+}
 
 
 class AmazonScraper(BaseScraper):
     """Scraper spécialisé pour Amazon avec techniques anti-détection avancées."""
     
-    def __init__(self, max_results: int = 50, domain: str = 'amazon.com'):
-        super().__init__(max_results)
+    def __init__(self, max_results: int = 50, domain: str = 'amazon.com', logger: LogFunc = safe_log,
+                 session: Optional[AsyncClient] = None, rate_limiter: Optional[TokenBucket] = None):
+        super().__init__(max_results, logger=logger, session=session, rate_limiter=rate_limiter)
         self.domain = domain
         self.base_url = f'https://www.{domain}'
         
@@ -33,7 +72,6 @@ class AmazonScraper(BaseScraper):
         
         # Configuration retry inspirée des actors Apify
         self.max_retries = 3
-        self.retry_delay_base = 5.0
         self.use_residential_proxy = True
         
         # Sélecteurs multiples pour robustesse
@@ -62,15 +100,12 @@ class AmazonScraper(BaseScraper):
                 
                 if len(products) >= self.max_results:
                     break
-                    
-                # Délai entre stratégies
-                await self.random_delay(3.0, 8.0)
             
-            await safe_log('info', f'Amazon: Total {len(products)} produits extraits')
+            await self._log('info', f'Amazon: Total {len(products)} produits extraits')
             return products[:self.max_results]
             
         except Exception as e:
-            await safe_log('error', f'Erreur lors de la recherche Amazon: {str(e)}')
+            await self._log('error', f'Erreur lors de la recherche Amazon: {str(e)}')
             return products
     
     async def _setup_amazon_headers(self):
@@ -101,8 +136,8 @@ class AmazonScraper(BaseScraper):
             'DNT': '1'
         }
         
-        # Mettre à jour les headers de session
-        self.session.headers.update(amazon_headers)
+        # Mettre à jour les headers envoyés par ce scraper
+        self.headers.update(amazon_headers)
     
     async def _try_search_strategy(self, search_term: str, strategy: int) -> List[Product]:
         """Essaie une stratégie de recherche spécifique."""
@@ -124,11 +159,11 @@ class AmazonScraper(BaseScraper):
                         else:
                             search_url = f'{self.base_url}{endpoint.format(quote_plus(search_term))}'
                         
-                        await safe_log('info', f'Amazon stratégie {strategy+1}, endpoint {i+1}, tentative {retry+1}: {search_url[:100]}...')
+                        await self._log('info', f'Amazon stratégie {strategy+1}, endpoint {i+1}, tentative {retry+1}: {search_url[:100]}...')
                         
-                        # Délai progressif avec retry
-                        delay = self.retry_delay_base * (retry + 1) + random.uniform(2.0, 8.0)
-                        await asyncio.sleep(delay)
+                        # Backoff uniquement sur les nouvelles tentatives, le débit est géré par rate_limiter
+                        if retry > 0:
+                            await self.backoff_delay(retry)
                         
                         soup = await self._get_page_with_retry(search_url)
                         if not soup:
@@ -136,7 +171,7 @@ class AmazonScraper(BaseScraper):
                         
                         # Détection de blocage améliorée
                         if await self._is_blocked(soup):
-                            await safe_log('warning', f'Blocage détecté, retry {retry+1}/{self.max_retries}')
+                            await self._log('warning', f'Blocage détecté, retry {retry+1}/{self.max_retries}')
                             if retry < self.max_retries - 1:
                                 await self._rotate_headers()
                                 continue
@@ -147,38 +182,36 @@ class AmazonScraper(BaseScraper):
                         product_containers = await self._find_product_containers(soup)
                         
                         if product_containers:
-                            await safe_log('info', f'Trouvé {len(product_containers)} conteneurs de produits')
+                            await self._log('info', f'Trouvé {len(product_containers)} conteneurs de produits')
                             
                             # Extraire les produits avec limite
                             extracted_count = 0
+                            scraped_at = datetime.now().isoformat()  # Horodatage commun à tout le lot
                             for container in product_containers:
                                 if len(products) >= self.max_results:
                                     break
                                     
-                                product = await self._extract_product_info_enhanced(container)
+                                product = await self._extract_product_info_enhanced(container, scraped_at)
                                 if product:
                                     products.append(product)
                                     extracted_count += 1
-                                    await safe_log('info', f'Produit Amazon extrait: {product.title[:50]}...')
-                                
-                                # Petit délai entre extractions
-                                await asyncio.sleep(random.uniform(0.3, 1.5))
+                                    await self._log('info', f'Produit Amazon extrait: {product.title[:50]}...')
                             
-                            await safe_log('info', f'Extraits {extracted_count} produits de cette page')
+                            await self._log('info', f'Extraits {extracted_count} produits de cette page')
                             break  # Succès, sortir de la boucle retry
                         
                         else:
-                            await safe_log('warning', f'Aucun conteneur de produit trouvé')
+                            await self._log('warning', f'Aucun conteneur de produit trouvé')
                             
                     except Exception as e:
-                        await safe_log('error', f'Erreur endpoint {i+1}, retry {retry+1}: {str(e)}')
+                        await self._log('error', f'Erreur endpoint {i+1}, retry {retry+1}: {str(e)}')
                         if retry == self.max_retries - 1:
-                            await safe_log('error', f'Échec définitif pour endpoint {i+1}')
+                            await self._log('error', f'Échec définitif pour endpoint {i+1}')
             
-            await safe_log('info', f'Total produits Amazon trouvés: {len(products)}')
+            await self._log('info', f'Total produits Amazon trouvés: {len(products)}')
             
         except Exception as e:
-            await safe_log('error', f'Erreur lors du scraping Amazon: {str(e)}')
+            await self._log('error', f'Erreur lors du scraping Amazon: {str(e)}')
         
         return products
     
@@ -187,18 +220,21 @@ class AmazonScraper(BaseScraper):
         try:
             return await self.get_page_content(url)
         except Exception as e:
-            await safe_log('error', f'Erreur lors de la récupération de page: {str(e)}')
+            await self._log('error', f'Erreur lors de la récupération de page: {str(e)}')
             return None
     
     async def _is_blocked(self, soup: BeautifulSoup) -> bool:
         """Détecte si on a été bloqué par Amazon."""
+        # Texte de la page matérialisé une seule fois pour tous les indicateurs
+        page_text = soup.get_text().lower()
+        
         # Indicateurs de blocage inspirés des actors Apify
         block_indicators = [
             soup.find('img', {'alt': 'captcha'}),
-            'robot' in soup.get_text().lower(),
-            'blocked' in soup.get_text().lower(),
+            'robot' in page_text,
+            'blocked' in page_text,
             soup.find('form', {'action': lambda x: x and 'captcha' in x}),
-            'sorry, we just need to make sure you\'re not a robot' in soup.get_text().lower(),
+            'sorry, we just need to make sure you\'re not a robot' in page_text,
             soup.find('div', {'id': 'captchacharacters'})
         ]
         
@@ -207,7 +243,7 @@ class AmazonScraper(BaseScraper):
     async def _rotate_headers(self):
         """Fait tourner les headers pour éviter la détection."""
         await self._setup_amazon_headers()
-        await safe_log('info', 'Headers rotés pour éviter la détection')
+        await self._log('info', 'Headers rotés pour éviter la détection')
     
     async def _find_product_containers(self, soup: BeautifulSoup) -> List:
         """Trouve les conteneurs de produits avec sélecteurs multiples."""
@@ -215,20 +251,20 @@ class AmazonScraper(BaseScraper):
             try:
                 containers = soup.select(selector)
                 if containers:
-                    await safe_log('info', f'Sélecteur réussi: {selector} ({len(containers)} éléments)')
+                    await self._log('info', f'Sélecteur réussi: {selector} ({len(containers)} éléments)')
                     return containers
             except Exception as e:
-                await safe_log('warning', f'Erreur sélecteur {selector}: {str(e)}')
+                await self._log('warning', f'Erreur sélecteur {selector}: {str(e)}')
                 continue
         
         # Fallback vers les anciens sélecteurs
         fallback_containers = soup.find_all('div', {'data-asin': True})
         if fallback_containers:
-            await safe_log('info', f'Fallback sélecteur réussi ({len(fallback_containers)} éléments)')
+            await self._log('info', f'Fallback sélecteur réussi ({len(fallback_containers)} éléments)')
         
         return fallback_containers
     
-    async def _extract_product_info_enhanced(self, container: BeautifulSoup) -> Optional[Product]:
+    async def _extract_product_info_enhanced(self, container: BeautifulSoup, scraped_at: str) -> Optional[Product]:
         """Extraction améliorée des informations produit avec sélecteurs robustes."""
         try:
             # Extraction du titre avec sélecteurs multiples
@@ -261,29 +297,22 @@ class AmazonScraper(BaseScraper):
                 availability='In Stock',  # Amazon par défaut
                 rating=rating,
                 asin=asin,
-                scraped_at=datetime.now().isoformat()
+                scraped_at=scraped_at
             )
             
         except Exception as e:
-            await safe_log('error', f'Erreur extraction produit: {str(e)}')
+            await self._log('error', f'Erreur extraction produit: {str(e)}')
             return None
     
     async def _extract_title(self, container: BeautifulSoup) -> Optional[str]:
         """Extrait le titre avec sélecteurs multiples."""
-        title_selectors = [
-            'h2 a span',
-            'h2 span',
-            '.s-size-mini span',
-            '[data-cy="title-recipe-title"]',
-            '.a-size-base-plus',
-            '.a-size-medium'
-        ]
-        
-        for selector in title_selectors:
+        for selector in TITLE_SELECTORS:
             try:
-                element = container.select_one(selector)
-                if element and element.get_text(strip=True):
-                    return element.get_text(strip=True)
+                element = selector.select_one(container)
+                if element:
+                    title = element.get_text(strip=True)
+                    if title:
+                        return title
             except:
                 continue
         
@@ -291,21 +320,13 @@ class AmazonScraper(BaseScraper):
     
     async def _extract_price(self, container: BeautifulSoup) -> tuple[Optional[float], Optional[str]]:
         """Extrait le prix avec sélecteurs multiples."""
-        price_selectors = [
-            '.a-price-whole',
-            '.a-price .a-offscreen',
-            '.a-price-range .a-offscreen',
-            '.a-price-symbol + .a-price-whole'
-        ]
-        
-        for selector in price_selectors:
+        for selector in PRICE_SELECTORS:
             try:
-                element = container.select_one(selector)
+                element = selector.select_one(container)
                 if element:
-                    price_text = element.get_text(strip=True)
+                    price_text = self.leaf_text(element).strip()
                     # Extraction du prix numérique
-                    import re
-                    price_match = re.search(r'[\d,]+\.?\d*', price_text.replace(',', ''))
+                    price_match = PRICE_RE.search(price_text.replace(',', ''))
                     if price_match:
                         price = float(price_match.group())
                         currency = '$'  # Par défaut USD pour Amazon.com
@@ -317,15 +338,9 @@ class AmazonScraper(BaseScraper):
     
     async def _extract_url(self, container: BeautifulSoup) -> Optional[str]:
         """Extrait l'URL du produit."""
-        url_selectors = [
-            'h2 a',
-            '.a-link-normal',
-            'a[href*="/dp/"]'
-        ]
-        
-        for selector in url_selectors:
+        for selector in URL_SELECTORS:
             try:
-                element = container.select_one(selector)
+                element = selector.select_one(container)
                 if element and element.get('href'):
                     href = element.get('href')
                     if href.startswith('/'):
@@ -339,7 +354,7 @@ class AmazonScraper(BaseScraper):
     async def _extract_image(self, container: BeautifulSoup) -> Optional[str]:
         """Extrait l'URL de l'image."""
         try:
-            img = container.select_one('img')
+            img = IMAGE_SELECTOR.select_one(container)
             if img:
                 return img.get('src') or img.get('data-src')
         except:
@@ -349,129 +364,48 @@ class AmazonScraper(BaseScraper):
     async def _extract_rating(self, container: BeautifulSoup) -> Optional[float]:
         """Extrait la note du produit."""
         try:
-            rating_element = container.select_one('.a-icon-alt')
+            rating_element = RATING_SELECTOR.select_one(container)
             if rating_element:
-                rating_text = rating_element.get_text()
-                import re
-                rating_match = re.search(r'(\d+\.\d+)', rating_text)
+                rating_text = self.leaf_text(rating_element)
+                rating_match = DECIMAL_RATING_RE.search(rating_text)
                 if rating_match:
                     return float(rating_match.group(1))
         except:
             pass
         return None
     
-    async def _extract_product_info(self, container: BeautifulSoup) -> Optional[Product]:
-        """Extrait les informations d'un produit depuis son conteneur."""
-        try:
-            # Titre du produit
-            title_elem = container.find('h2', class_='a-size-mini') or container.find('span', class_='a-size-base-plus')
-            if not title_elem:
-                return None
-            
-            title_link = title_elem.find('a')
-            if not title_link:
-                return None
-                
-            title = self.clean_text(title_link.get_text())
-            product_url = self.base_url + title_link.get('href', '')
-            
-            # Prix
-            price = None
-            currency = 'USD'
-            
-            # Différents sélecteurs pour le prix
-            price_elem = (
-                container.find('span', class_='a-price-whole') or
-                container.find('span', class_='a-offscreen') or
-                container.find('span', class_='a-price')
-            )
-            
-            if price_elem:
-                price_text = price_elem.get_text()
-                price = self.extract_price(price_text)
-                
-                # Détection de la devise
-                if '$' in price_text:
-                    currency = 'USD'
-                elif '€' in price_text:
-                    currency = 'EUR'
-                elif '£' in price_text:
-                    currency = 'GBP'
-            
-            # Image
-            img_elem = container.find('img', class_='s-image')
-            image_url = img_elem.get('src') if img_elem else None
-            
-            # Note et avis
-            rating = None
-            reviews_count = None
-            
-            rating_elem = container.find('span', class_='a-icon-alt')
-            if rating_elem:
-                rating_text = rating_elem.get_text()
-                rating = self.extract_rating(rating_text)
-            
-            reviews_elem = container.find('span', class_='a-size-base')
-            if reviews_elem and '(' in reviews_elem.get_text():
-                reviews_text = reviews_elem.get_text()
-                reviews_count = self.extract_reviews_count(reviews_text)
-            
-            # Disponibilité
-            availability = 'En stock'
-            availability_elem = container.find('span', string=lambda text: text and ('stock' in text.lower() or 'disponible' in text.lower()))
-            if availability_elem:
-                availability = self.clean_text(availability_elem.get_text())
-            
-            # Vendeur (souvent Amazon ou vendeur tiers)
-            seller = 'Amazon'
-            seller_elem = container.find('span', class_='a-size-base-plus')
-            if seller_elem and 'by' in seller_elem.get_text().lower():
-                seller = self.clean_text(seller_elem.get_text())
-            
-            return Product(
-                title=title,
-                price=price,
-                currency=currency,
-                url=product_url,
-                image_url=image_url,
-                rating=rating,
-                reviews_count=reviews_count,
-                availability=availability,
-                seller=seller,
-                platform=self.get_platform_name(),
-                scraped_at=datetime.now()
-            )
-            
-        except Exception as e:
-            await safe_log('warning', f'Erreur extraction produit Amazon: {str(e)}')
-            return None
-    
     async def get_product_details(self, product_url: str) -> Optional[dict]:
         """Récupère les détails complets d'un produit."""
+        cached = self.get_cached_details(product_url)
+        if cached is not None:
+            return cached
+        
         try:
             soup = await self.get_page_content(product_url)
             if not soup:
                 return None
             
             details = {}
+            found = self.find_first_elements(soup, PRODUCT_DETAIL_TARGETS)
             
             # Description
-            desc_elem = soup.find('div', {'id': 'feature-bullets'}) or soup.find('div', {'id': 'productDescription'})
+            desc_elem = found['feature_bullets'] or found['product_description']
             if desc_elem:
                 details['description'] = self.clean_text(desc_elem.get_text())
             
             # Marque
-            brand_elem = soup.find('span', {'id': 'bylineInfo'}) or soup.find('a', {'id': 'bylineInfo'})
+            brand_elem = found['byline']
             if brand_elem:
                 details['brand'] = self.clean_text(brand_elem.get_text())
             
             # ASIN (identifiant Amazon)
-            asin_elem = soup.find('div', {'data-asin': True})
+            asin_elem = found['asin']
             if asin_elem:
                 details['sku'] = asin_elem.get('data-asin')
             
+            self.cache_details(product_url, details)
             return details
             
         except Exception as e:
-            await safe_log('warning', f'Erreur récupération détails Amazon: {str(e)}')
+            await self._log('warning', f'Erreur récupération détails Amazon: {str(e)}')
             return None
\ No newline at end of file
@@ -1,17 +1,19 @@
 """Classe de base pour tous les scrapers e-commerce."""
 
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable
 from dataclasses import dataclass
+from collections import OrderedDict
 from datetime import datetime
 import asyncio
 import random
+import re
 from fake_useragent import UserAgent
 from httpx import AsyncClient
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 from apify import Actor
 
-from src.utils import safe_log
+from src.utils import safe_log, LogFunc, TokenBucket
 
 try:
     from src.config.anti_detection import AntiDetectionConfig
@@ -38,9 +40,23 @@ except ImportError:
             return ['captcha', 'blocked', 'access denied']
 
 
-@dataclass
+# Expressions régulières de nettoyage, compilées une seule fois pour tous les produits
+PRICE_CLEAN_RE = re.compile(r'[^\d.,]')
+RATING_RE = re.compile(r'(\d+(?:\.\d+)?)')
+REVIEWS_COUNT_RE = re.compile(r'([\d,]+)')
+WHITESPACE_RE = re.compile(r'\s+')
+
+# Indicateurs de blocage recherchés, en octets, dans le début de la réponse avant tout parsing
+BLOCK_INDICATORS = (
+    b'captcha', b'robot', b'blocked', b'access denied',
+    b'security check', b'unusual traffic', b'api-services-support'
+)
+BLOCK_PROBE_BYTES = 8192
+
+
+@dataclass(slots=True, frozen=True)
 class Product:
-    """Structure de données pour un produit."""
+    """Structure de données pour un produit (immuable, sans __dict__ par instance)."""
     title: str
     price: Optional[float]
     currency: str
@@ -81,11 +97,33 @@ class Product:
 
 class BaseScraper(ABC):
     """Classe de base abstraite pour tous les scrapers."""
-    
-    def __init__(self, max_results: int = 50):
+
+    # Nombre maximum de recherches simultanées vers une même plateforme
+    PER_HOST_CONCURRENCY = 8
+
+    # Nombre de fiches produit conservées dans le cache LRU des détails
+    DETAILS_CACHE_SIZE = 512
+
+    # Débit maximum vers la plateforme : REQUESTS_PER_PERIOD requêtes toutes les RATE_PERIOD secondes
+    REQUESTS_PER_PERIOD = 4
+    RATE_PERIOD = 10.0
+
+    def __init__(self, max_results: int = 50, logger: LogFunc = safe_log,
+                 session: Optional[AsyncClient] = None, rate_limiter: Optional[TokenBucket] = None):
         self.max_results = max_results
+        self._log = logger
+        self._details_cache: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        # Limiteur fourni par l'appelant (débit configuré de l'extérieur), sinon débit par défaut de la plateforme
+        self.rate_limiter = rate_limiter or TokenBucket(
+            rate=self.REQUESTS_PER_PERIOD / self.RATE_PERIOD,
+            capacity=self.REQUESTS_PER_PERIOD
+        )
         self.ua = UserAgent()
-        self.session = None
+        # Client HTTP éventuellement partagé entre scrapers: fermé ici seulement s'il a été créé ici
+        self.session = session
+        self._owns_session = session is None
+        # Headers propres au scraper, envoyés à chaque requête pour ne pas modifier un client partagé
+        self.headers: Dict[str, str] = {}
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -95,12 +133,11 @@ class BaseScraper(ABC):
         ]
         
     async def __aenter__(self):
-        """Initialise la session HTTP avec des headers anti-détection."""
-        self.session = AsyncClient(
-            headers=self.get_random_headers(),
-            timeout=30.0,
-            follow_redirects=True
-        )
+        """Initialise la session HTTP (si aucune n'est partagée) et les headers anti-détection."""
+        self.headers = self.get_random_headers()
+        if self.session is None:
+            self.session = AsyncClient(timeout=30.0, follow_redirects=True)
+            self._owns_session = True
         return self
     
     def get_random_headers(self, platform: str = None, base_url: str = None) -> Dict[str, str]:
@@ -108,9 +145,10 @@ class BaseScraper(ABC):
         return AntiDetectionConfig.generate_realistic_headers(platform, base_url)
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Ferme la session HTTP."""
-        if self.session:
+        """Ferme la session HTTP si elle appartient à ce scraper."""
+        if self.session and self._owns_session:
             await self.session.aclose()
+            self.session = None
     
     @abstractmethod
     async def search_products(self, search_term: str) -> List[Product]:
@@ -121,7 +159,33 @@ class BaseScraper(ABC):
     def get_platform_name(self) -> str:
         """Retourne le nom de la plateforme."""
         pass
+
+    async def search_many(self, search_terms: List[str]) -> Dict[str, List[Product]]:
+        """Recherche plusieurs termes en parallèle, avec une concurrence bornée par hôte."""
+        semaphore = asyncio.Semaphore(self.PER_HOST_CONCURRENCY)
+
+        async def search_one(search_term: str) -> List[Product]:
+            async with semaphore:
+                return await self.search_products(search_term)
+
+        results = await asyncio.gather(*(search_one(term) for term in search_terms))
+        return dict(zip(search_terms, results))
+
+    def get_cached_details(self, product_url: str) -> Optional[Dict[str, Any]]:
+        """Retourne les détails déjà récupérés pour cette URL, s'ils sont en cache."""
+        details = self._details_cache.get(product_url)
+        if details is None:
+            return None
+        self._details_cache.move_to_end(product_url)
+        return dict(details)
     
+    def cache_details(self, product_url: str, details: Dict[str, Any]) -> None:
+        """Mémorise les détails d'un produit en évinçant l'entrée la plus ancienne si nécessaire."""
+        self._details_cache[product_url] = dict(details)
+        self._details_cache.move_to_end(product_url)
+        if len(self._details_cache) > self.DETAILS_CACHE_SIZE:
+            self._details_cache.popitem(last=False)
+
     async def random_delay(self, min_seconds: float = None, max_seconds: float = None, platform: str = None):
         """Ajoute un délai aléatoire pour éviter la détection."""
         # Utiliser les délais spécifiques à la plateforme si disponibles
@@ -135,7 +199,19 @@ class BaseScraper(ABC):
         gaussian_variation = random.gauss(0, 0.5)
         delay = max(0.5, base_delay + gaussian_variation)
         
-        await safe_log('info', f"Attente de {delay:.2f} secondes...")
+        await self._log('info', f"Attente de {delay:.2f} secondes...")
+        await asyncio.sleep(delay)
+    
+    async def backoff_delay(self, attempt: int, retry_after: Optional[str] = None):
+        """Attend avant une nouvelle tentative : backoff exponentiel avec gigue, plus Retry-After si fourni."""
+        delay = min(60.0, 2 ** attempt) + random.uniform(0, 1)
+        if retry_after:
+            try:
+                delay += float(retry_after)
+            except ValueError:
+                pass  # Retry-After au format date HTTP : on garde le backoff seul
+        
+        await self._log('info', f"Nouvelle tentative dans {delay:.2f} secondes...")
         await asyncio.sleep(delay)
     
     def extract_price(self, price_text: str) -> Optional[float]:
@@ -143,9 +219,8 @@ class BaseScraper(ABC):
         if not price_text:
             return None
         
-        import re
         # Supprime les caractères non numériques sauf les points et virgules
-        price_clean = re.sub(r'[^\d.,]', '', price_text.replace(',', '.'))
+        price_clean = PRICE_CLEAN_RE.sub('', price_text.replace(',', '.'))
         
         try:
             return float(price_clean)
@@ -157,8 +232,7 @@ class BaseScraper(ABC):
         if not rating_text:
             return None
             
-        import re
-        rating_match = re.search(r'(\d+(?:\.\d+)?)', rating_text)
+        rating_match = RATING_RE.search(rating_text)
         if rating_match:
             try:
                 return float(rating_match.group(1))
@@ -171,9 +245,8 @@ class BaseScraper(ABC):
         if not reviews_text:
             return None
             
-        import re
         # Recherche des nombres avec des séparateurs de milliers
-        reviews_match = re.search(r'([\d,]+)', reviews_text.replace(' ', '').replace('.', ','))
+        reviews_match = REVIEWS_COUNT_RE.search(reviews_text.replace(' ', '').replace('.', ','))
         if reviews_match:
             try:
                 return int(reviews_match.group(1).replace(',', ''))
@@ -184,61 +257,85 @@ class BaseScraper(ABC):
     async def get_page_content(self, url: str, max_retries: int = 3) -> Optional[BeautifulSoup]:
         """Récupère le contenu d'une page web avec retry et anti-détection."""
         if not self.session:
-            await safe_log('error', "Session non initialisée. Utilisez 'async with scraper:' pour initialiser.")
+            await self._log('error', "Session non initialisée. Utilisez 'async with scraper:' pour initialiser.")
             return None
             
         for attempt in range(max_retries):
             try:
                 # Rotation des headers à chaque tentative
                 if attempt > 0:
-                    self.session.headers.update(self.get_random_headers())
-                    await self.random_delay(3.0, 10.0)  # Délai plus long entre les tentatives
+                    self.headers = self.get_random_headers()
                 
-                await safe_log('info', f"Tentative {attempt + 1}/{max_retries} pour {url}")
+                await self._log('info', f"Tentative {attempt + 1}/{max_retries} pour {url}")
                 
-                response = await self.session.get(url)
+                # Le seau de jetons cadence les requêtes au lieu d'un délai aléatoire fixe
+                async with self.rate_limiter:
+                    response = await self.session.get(url, headers=self.headers)
                 
                 if response.status_code == 403:
-                    await safe_log('warning', f"Accès refusé (403) pour {url}, tentative {attempt + 1}")
+                    await self._log('warning', f"Accès refusé (403) pour {url}, tentative {attempt + 1}")
                     if attempt < max_retries - 1:
-                        await self.random_delay(5.0, 15.0)
+                        await self.backoff_delay(attempt)
                         continue
                     
                 elif response.status_code == 429:
-                    await safe_log('warning', f"Trop de requêtes (429) pour {url}, attente plus longue")
+                    await self._log('warning', f"Trop de requêtes (429) pour {url}, attente plus longue")
                     if attempt < max_retries - 1:
-                        await self.random_delay(10.0, 30.0)
+                        await self.backoff_delay(attempt, retry_after=response.headers.get('Retry-After', '30'))
                         continue
                 
                 response.raise_for_status()
                 
-                # Vérifier si la page contient des indicateurs de détection
-                content = response.text
-                if any(indicator in content.lower() for indicator in [
-                    'captcha', 'robot', 'blocked', 'access denied', 
-                    'security check', 'unusual traffic'
-                ]):
-                    await safe_log('warning', f"Détection possible sur {url}, rotation des headers")
+                # Vérifier les indicateurs de détection sur les premiers octets, sans décoder la page
+                content = response.content
+                head = content[:BLOCK_PROBE_BYTES].lower()
+                if any(indicator in head for indicator in BLOCK_INDICATORS):
+                    await self._log('warning', f"Détection possible sur {url}, rotation des headers")
                     if attempt < max_retries - 1:
                         continue
                 
-                return BeautifulSoup(content, 'html.parser')
+                # lxml détecte l'encodage à partir des octets (BOM, <meta charset>)
+                return BeautifulSoup(content, 'lxml')
                 
             except Exception as e:
-                await safe_log('error', f"Erreur tentative {attempt + 1} pour {url}: {e}")
+                await self._log('error', f"Erreur tentative {attempt + 1} pour {url}: {e}")
                 if attempt < max_retries - 1:
-                    await self.random_delay(2.0, 8.0)
+                    await self.backoff_delay(attempt)
                     continue
         
-        await safe_log('error', f"Échec de récupération après {max_retries} tentatives pour {url}")
+        await self._log('error', f"Échec de récupération après {max_retries} tentatives pour {url}")
         return None
     
+    def find_first_elements(self, soup: BeautifulSoup,
+                            targets: Dict[str, Callable[[Tag], bool]]) -> Dict[str, Optional[Tag]]:
+        """Parcourt le DOM une seule fois et retourne le premier élément correspondant à chaque cible."""
+        found: Dict[str, Optional[Tag]] = dict.fromkeys(targets)
+        # Instantané des cibles restantes, reconstruit seulement quand une cible est trouvée
+        remaining = tuple(targets.items())
+        
+        for element in soup.descendants:
+            if not isinstance(element, Tag):
+                continue
+            matched = [key for key, matches in remaining if matches(element)]
+            if matched:
+                for key in matched:
+                    found[key] = element
+                remaining = tuple(item for item in remaining if item[0] not in matched)
+                if not remaining:
+                    break  # Toutes les cibles trouvées, inutile de finir le parcours
+        
+        return found
+    
+    def leaf_text(self, element) -> str:
+        """Retourne le texte d'un élément feuille sans parcourir tout le sous-arbre."""
+        text = element.string
+        return text if text is not None else element.get_text()
+    
     def clean_text(self, text: str) -> str:
         """Nettoie et normalise le texte."""
         if not text:
             return ''
         
-        import re
         # Supprime les espaces multiples et les caractères de contrôle
-        cleaned = re.sub(r'\s+', ' ', text.strip())
+        cleaned = WHITESPACE_RE.sub(' ', text.strip())
         return cleaned
\ No newline at end of file
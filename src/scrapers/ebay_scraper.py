@@ -4,19 +4,32 @@ from typing import List, Optional
 from datetime import datetime
 from urllib.parse import quote_plus
 from bs4 import BeautifulSoup
+from httpx import AsyncClient
 from apify import Actor
 
 from .base_scraper import BaseScraper, Product
 
 # Import de la fonction safe_log depuis utils
-from ..utils import safe_log
+from ..utils import safe_log, LogFunc, TokenBucket
+
+
+# Éléments recherchés sur une fiche produit, collectés en un seul parcours du DOM
+PRODUCT_DETAIL_TARGETS = {
+    'desc_div': lambda el: el.name == 'div' and el.get('id') == 'desc_div',
+    'cond_text_div': lambda el: el.name == 'div' and el.get('class') == ['u-flL', 'condText'],
+    'condition_div': lambda el: el.name == 'div' and el.get('id') == 'u_kp_1',
+    'condition_span': lambda el: el.name == 'span' and el.get('id') == 'cc_condText',
+    'item_number': lambda el: el.name == 'span' and el.get('id') == 'x-item-title-label',
+    'seller_info': lambda el: el.name == 'span' and 'mbg-nw' in el.get('class', ()),
+}
 
 
 class EbayScraper(BaseScraper):
     """Scraper spécialisé pour eBay."""
     
-    def __init__(self, max_results: int = 50, domain: str = 'ebay.com'):
-        super().__init__(max_results)
+    def __init__(self, max_results: int = 50, domain: str = 'ebay.com', logger: LogFunc = safe_log,
+                 session: Optional[AsyncClient] = None, rate_limiter: Optional[TokenBucket] = None):
+        super().__init__(max_results, logger=logger, session=session, rate_limiter=rate_limiter)
         self.domain = domain
         self.base_url = f'https://www.{domain}'
     
@@ -30,7 +43,7 @@ class EbayScraper(BaseScraper):
         try:
             # Construction de l'URL de recherche eBay
             search_url = f'{self.base_url}/sch/i.html?_nkw={quote_plus(search_term)}&_sacat=0'
-            await safe_log('info', f'Recherche eBay: {search_url}')
+            await self._log('info', f'Recherche eBay: {search_url}')
             
             soup = await self.get_page_content(search_url)
             if not soup:
@@ -38,21 +51,22 @@ class EbayScraper(BaseScraper):
             
             # Sélecteurs pour les résultats de recherche eBay
             product_containers = soup.find_all('div', class_='s-item__wrapper clearfix')
+            scraped_at = datetime.now()  # Horodatage commun à tout le lot
             
             for container in product_containers[:self.max_results]:
-                product = await self._extract_product_info(container)
+                product = await self._extract_product_info(container, scraped_at)
                 if product:
                     products.append(product)
-                    await safe_log('info', f'Produit eBay extrait: {product.title[:50]}...')
+                    await self._log('info', f'Produit eBay extrait: {product.title[:50]}...')
             
-            await safe_log('info', f'Total produits eBay trouvés: {len(products)}')
+            await self._log('info', f'Total produits eBay trouvés: {len(products)}')
             
         except Exception as e:
-            await safe_log('error', f'Erreur lors du scraping eBay: {str(e)}')
+            await self._log('error', f'Erreur lors du scraping eBay: {str(e)}')
         
         return products
     
-    async def _extract_product_info(self, container: BeautifulSoup) -> Optional[Product]:
+    async def _extract_product_info(self, container: BeautifulSoup, scraped_at: datetime) -> Optional[Product]:
         """Extrait les informations d'un produit depuis son conteneur."""
         try:
             # Titre du produit
@@ -73,7 +87,7 @@ class EbayScraper(BaseScraper):
             
             price_elem = container.find('span', class_='s-item__price')
             if price_elem:
-                price_text = price_elem.get_text()
+                price_text = self.leaf_text(price_elem)
                 price = self.extract_price(price_text)
                 
                 # Détection de la devise
@@ -94,38 +108,38 @@ class EbayScraper(BaseScraper):
             
             rating_elem = container.find('span', class_='clipped')
             if rating_elem:
-                rating_text = rating_elem.get_text()
+                rating_text = self.leaf_text(rating_elem)
                 rating = self.extract_rating(rating_text)
             
             # Disponibilité et type de vente
             availability = 'Disponible'
             condition_elem = container.find('span', class_='SECONDARY_INFO')
             if condition_elem:
-                availability = self.clean_text(condition_elem.get_text())
+                availability = self.clean_text(self.leaf_text(condition_elem))
             
             # Type de vente (Achat immédiat, Enchère, etc.)
             sale_type_elem = container.find('span', class_='s-item__purchase-options-with-icon')
             if sale_type_elem:
-                sale_type = self.clean_text(sale_type_elem.get_text())
+                sale_type = self.clean_text(self.leaf_text(sale_type_elem))
                 availability += f' - {sale_type}'
             
             # Vendeur
             seller = 'eBay Seller'
             seller_elem = container.find('span', class_='s-item__seller-info-text')
             if seller_elem:
-                seller = self.clean_text(seller_elem.get_text())
+                seller = self.clean_text(self.leaf_text(seller_elem))
             
             # Localisation
             location_elem = container.find('span', class_='s-item__location')
             location = None
             if location_elem:
-                location = self.clean_text(location_elem.get_text())
+                location = self.clean_text(self.leaf_text(location_elem))
             
             # Frais de livraison
             shipping_elem = container.find('span', class_='s-item__shipping')
             shipping_info = None
             if shipping_elem:
-                shipping_info = self.clean_text(shipping_elem.get_text())
+                shipping_info = self.clean_text(self.leaf_text(shipping_elem))
             
             return Product(
                 title=title,
@@ -138,47 +152,53 @@ class EbayScraper(BaseScraper):
                 availability=availability,
                 seller=seller,
                 platform=self.get_platform_name(),
-                scraped_at=datetime.now(),
+                scraped_at=scraped_at,
                 description=f'Localisation: {location}' + (f' - Livraison: {shipping_info}' if shipping_info else '') if location else shipping_info
             )
             
         except Exception as e:
-            await safe_log('warning', f'Erreur extraction produit eBay: {str(e)}')
+            await self._log('warning', f'Erreur extraction produit eBay: {str(e)}')
             return None
     
     async def get_product_details(self, product_url: str) -> Optional[dict]:
         """Récupère les détails complets d'un produit eBay."""
+        cached = self.get_cached_details(product_url)
+        if cached is not None:
+            return cached
+        
         try:
             soup = await self.get_page_content(product_url)
             if not soup:
                 return None
             
             details = {}
+            found = self.find_first_elements(soup, PRODUCT_DETAIL_TARGETS)
             
             # Description
-            desc_elem = soup.find('div', {'id': 'desc_div'}) or soup.find('div', class_='u-flL condText')
+            desc_elem = found['desc_div'] or found['cond_text_div']
             if desc_elem:
                 details['description'] = self.clean_text(desc_elem.get_text())
             
             # Condition de l'objet
-            condition_elem = soup.find('div', {'id': 'u_kp_1'}) or soup.find('span', {'id': 'cc_condText'})
+            condition_elem = found['condition_div'] or found['condition_span']
             if condition_elem:
                 details['condition'] = self.clean_text(condition_elem.get_text())
             
             # Numéro d'objet eBay
-            item_number_elem = soup.find('span', {'id': 'x-item-title-label'})
+            item_number_elem = found['item_number']
             if item_number_elem:
                 item_text = item_number_elem.get_text()
                 if '#' in item_text:
                     details['sku'] = item_text.split('#')[-1].strip()
             
             # Informations sur le vendeur
-            seller_info_elem = soup.find('span', class_='mbg-nw')
+            seller_info_elem = found['seller_info']
             if seller_info_elem:
                 details['seller_info'] = self.clean_text(seller_info_elem.get_text())
             
+            self.cache_details(product_url, details)
             return details
             
         except Exception as e:
-            await safe_log('warning', f'Erreur récupération détails eBay: {str(e)}')
+            await self._log('warning', f'Erreur récupération détails eBay: {str(e)}')
             return None
\ No newline at end of file
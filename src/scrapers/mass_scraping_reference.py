@@ -19,51 +19,96 @@ Version: 2.0 (Apify Actor)
 """
 
 import asyncio
-import json
+import logging
+import logging.handlers
+import queue
 import time
 import random
+import re
 import sys
-import os
+import httpx
+from collections import Counter, defaultdict, deque
+from contextlib import AsyncExitStack
+from dataclasses import asdict, is_dataclass
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 
+import orjson
+
 # Import Apify SDK
 from apify import Actor
 
-# Ajouter le répertoire racine au path pour les imports
-project_root = os.path.join(os.path.dirname(__file__), '..', '..')
-sys.path.insert(0, project_root)
-# Ajout du répertoire src pour les imports directs
-src_path = os.path.join(os.path.dirname(__file__), '..')
-sys.path.insert(0, src_path)
+from src.scrapers.amazon_scraper import AmazonScraper
+from src.scrapers.ebay_scraper import EbayScraper
+from src.utils import TokenBucket
+
+logger = logging.getLogger(__name__)
 
 # Configuration par défaut (sera remplacée par les inputs Apify)
 DEFAULT_CONFIG = {
     "target_products": 500,
     "max_retries": 3,
     "timeout_per_scraper": 30.0,
-    "pause_between_terms": (3.0, 7.0),  # min, max secondes
-    "pause_between_retries": (2.0, 5.0),
+    "requests_per_second": 5.0,  # débit global de requêtes HTTP, toutes plateformes confondues
+    "pause_between_retries": (2.0, 5.0),  # délai de base, base + gigue max du backoff
+    "max_retry_delay": 30.0,  # plafond du backoff exponentiel
+    "cache_ttl": 3600.0,  # durée de validité (s) des résultats mis en cache par (plateforme, terme)
+    "negative_cache_ttl": 600.0,  # durée (s) pendant laquelle un couple vide ou en échec n'est pas retenté
+    "concurrency": 10,  # Nombre de termes scrapés simultanément
     "search_terms": [
         "laptop", "gaming laptop", "macbook", "dell laptop", "hp laptop",
         "iphone", "iphone 15", "iphone 14", "smartphone", "apple iphone"
     ],
     "blocked_platforms": [],  # Aucune plateforme bloquée par défaut
+    "recent_products_window": 1000,  # produits récents gardés en mémoire pour le rapport et le fichier local
+    "pretty_output": False,  # JSON indenté (plus lisible mais plus volumineux)
     "output_dir": "output",
     "results_prefix": "mass_scraping_apify_results"
 }
 
+# Montant numérique d'un prix textuel, une fois les séparateurs de milliers retirés
+PRICE_RE = re.compile(r'\d*\.?\d+')
+
 class MassScrapingManager:
     """Gestionnaire principal pour le scraping massif optimisé avec Apify"""
     
     def __init__(self, config: Dict[str, Any] = None):
         self.config = config or DEFAULT_CONFIG
-        self.scrapers = {}
-        self.available_scrapers = []
+        # Valeurs de configuration résolues une fois pour toutes (évite les lookups dans les boucles)
+        config = self.config
+        self.target_products = int(config.get("target_products", 500))
+        self.search_terms = list(config.get("search_terms", []))
+        self.max_results = int(config.get("maxResults", config.get("max_results", 50)))
+        self.max_retries = int(config.get("max_retries", 3))
+        self.timeout = float(config.get("timeout_per_scraper", 30.0))
+        self.retry_pause_min, self.retry_pause_max = config.get("pause_between_retries", (2.0, 5.0))
+        self.max_retry_delay = float(config.get("max_retry_delay", 30.0))
+        self.cache_ttl = float(config.get("cache_ttl", 3600.0))
+        self.negative_cache_ttl = float(config.get("negative_cache_ttl", 600.0))
+        self.blocked_platforms = {platform.lower() for platform in config.get("blocked_platforms", [])}
+        self.concurrency = int(config.get("concurrency", 10))
+        self.pretty_output = bool(config.get("pretty_output", False))
+        self.output_dir = Path(config.get("output_dir", "output"))
+        self.results_prefix = config.get("results_prefix", "mass_scraping_apify_results")
+        
+        self.scrapers = {
+            "amazon": AmazonScraper,
+            "ebay": EbayScraper
+        }
+        self.scraper_instances = {}  # Une instance ouverte par plateforme, réutilisée pour toutes les recherches
+        self._exit_stack: Optional[AsyncExitStack] = None
+        self.available_scrapers = set()
+        self._available_platforms = ()  # Vue figée de available_scrapers, rafraîchie à chaque changement
         self.failed_scrapers = set()
+        self._results_cache: Dict[tuple, tuple] = {}  # (plateforme, terme) -> (horodatage, produits)
+        self._negative_cache: Dict[tuple, float] = {}  # (plateforme, terme) -> horodatage de l'échec
+        self._seen_urls: set = set()  # URLs déjà poussées: un produit n'est compté qu'une fois par exécution
         self.total_products = 0
-        self.all_products = []
+        # Les produits sont poussés dans le Dataset au fil de l'eau: seule une fenêtre récente reste en mémoire
+        self.recent_products = deque(maxlen=self.config.get("recent_products_window", 1000))
+        # Statistiques de prix calculées au fil de l'eau sur tous les produits
+        self._price_stats = {"min": float("inf"), "max": float("-inf"), "sum": 0.0, "count": 0}
         self.stats = {
             "start_time": None,
             "end_time": None,
@@ -71,250 +116,366 @@ class MassScrapingManager:
             "total_products": 0,
             "successful_searches": 0,
             "failed_searches": 0,
-            "platform_stats": {},
-            "term_stats": {}
+            "duplicates_skipped": 0,
+            "retries": 0,
+            "platform_stats": defaultdict(lambda: {"products": 0, "searches": 0, "successes": 0}),
+            "term_stats": Counter()
         }
         
-        # Import des scrapers
-        self._import_scrapers()
+        # Limiteur de débit partagé par toutes les plateformes, injecté dans les scrapers:
+        # c'est le seul appliqué, il remplace celui que chaque scraper crée par défaut
+        requests_per_second = self.config.get("requests_per_second", 5.0)
+        self.rate_limiter = TokenBucket(rate=requests_per_second, capacity=max(1.0, requests_per_second))
+        
+        # Nombre de plateformes scrapées simultanément pour un même terme
+        self.platform_semaphore = asyncio.Semaphore(
+            self.config.get("platform_concurrency", len(self.scrapers))
+        )
+    
+    async def __aenter__(self):
+        """Ouvre une instance de scraper par plateforme non bloquée (session HTTP partagée par toutes les recherches)"""
+        async with AsyncExitStack() as stack:
+            for platform_name, scraper_class in self.scrapers.items():
+                if platform_name.lower() in self.blocked_platforms:
+                    continue
+                scraper = scraper_class(max_results=self.max_results, rate_limiter=self.rate_limiter)
+                self.scraper_instances[platform_name] = await stack.enter_async_context(scraper)
+            # Toutes les sessions sont ouvertes: leur fermeture est reportée à __aexit__
+            self._exit_stack = stack.pop_all()
+        return self
     
-    def _import_scrapers(self):
-        """Import dynamique des scrapers disponibles"""
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Ferme les sessions des scrapers ouverts"""
         try:
-            # Essayer d'importer avec le chemin absolu
-            import sys
-            import os
-            
-            # Ajouter le répertoire des scrapers au path
-            scrapers_dir = os.path.dirname(__file__)
-            if scrapers_dir not in sys.path:
-                sys.path.insert(0, scrapers_dir)
-            
-            from amazon_scraper import AmazonScraper
-            from ebay_scraper import EbayScraper
-            
-            self.scrapers = {
-                "amazon": AmazonScraper,
-                "ebay": EbayScraper
-            }
-            print(f"✅ Scrapers importés avec succès: {list(self.scrapers.keys())}")
-            
-        except ImportError as e:
-            print(f"⚠️ Erreur d'importation des scrapers: {e}")
-            print("📝 Utilisation des MockScrapers pour les tests")
-            
-            # Fallback vers MockScrapers pour les tests
-            class MockScraper:
-                async def __aenter__(self):
-                    return self
-                
-                async def __aexit__(self, exc_type, exc_val, exc_tb):
-                    pass
-                
-                async def search_products(self, query: str, max_results: int = 50) -> List[Dict]:
-                    # Simuler des produits pour les tests
-                    await asyncio.sleep(1)  # Simuler le temps de scraping
-                    return [
-                        {
-                            "title": f"Mock {query} Product {i+1}",
-                            "price": f"${(i+1) * 10}.99",
-                            "url": f"https://example.com/product-{i+1}",
-                            "platform": "mock"
-                        }
-                        for i in range(min(max_results, 5))  # Limiter à 5 produits simulés
-                    ]
-            
-            self.scrapers = {
-                "amazon": MockScraper,
-                "ebay": MockScraper
-            }
+            if self._exit_stack is not None:
+                await self._exit_stack.__aexit__(exc_type, exc_val, exc_tb)
+        finally:
+            self._exit_stack = None
+            self.scraper_instances.clear()
+    
+    def _drop_duplicates(self, products: List[Dict]) -> List[Dict]:
+        """Retire les produits dont l'URL a déjà été vue (les produits sans URL sont conservés)"""
+        seen = self._seen_urls
+        unique = []
+        for product in products:
+            url = product.get('url')
+            if url:
+                url = sys.intern(url)
+                if url in seen:
+                    continue
+                seen.add(url)
+            unique.append(product)
+        self.stats["duplicates_skipped"] += len(products) - len(unique)
+        return unique
+    
+    def _update_price_stats(self, product: Dict) -> None:
+        """Intègre le prix d'un produit aux statistiques de prix en ligne"""
+        if not product.get('price'):
+            return
+        match = PRICE_RE.search(str(product['price']).replace(',', ''))
+        if not match:
+            return
+        price = float(match.group())
+        if not 0 < price < 10000:  # Filtrer les prix aberrants
+            return
+        stats = self._price_stats
+        stats["min"] = min(stats["min"], price)
+        stats["max"] = max(stats["max"], price)
+        stats["sum"] += price
+        stats["count"] += 1
     
     async def test_scraper_availability(self, platform_name: str) -> bool:
         """Test la disponibilité d'un scraper avec timeout"""
-        print(f"🧪 Test de disponibilité: {platform_name}")
+        logger.info(f"🧪 Test de disponibilité: {platform_name}")
         
         # Skip des plateformes bloquées
-        if platform_name.lower() in self.config.get("blocked_platforms", []):
-            print(f"⏭️ {platform_name} skippé (configuration)")
+        if platform_name.lower() in self.blocked_platforms:
+            logger.info(f"⏭️ {platform_name} skippé (configuration)")
             self.failed_scrapers.add(platform_name)
             return False
         
         try:
             scraper_class = self.scrapers[platform_name]
             
-            async with scraper_class(max_results=1) as scraper:
+            async with scraper_class(max_results=1, rate_limiter=self.rate_limiter) as scraper:
                 # Test rapide avec timeout
                 test_products = await asyncio.wait_for(
                     scraper.search_products("test"),
-                    timeout=self.config.get("timeout_per_scraper", 30.0)
+                    timeout=self.timeout
                 )
                 
                 if test_products and len(test_products) > 0:
-                    print(f"✅ {platform_name}: Fonctionnel ({len(test_products)} produit(s) test)")
+                    logger.info(f"✅ {platform_name}: Fonctionnel ({len(test_products)} produit(s) test)")
                     return True
                 else:
-                    print(f"⚠️ {platform_name}: Aucun produit retourné")
+                    logger.warning(f"⚠️ {platform_name}: Aucun produit retourné")
                     self.failed_scrapers.add(platform_name)
                     return False
                     
         except asyncio.TimeoutError:
-            print(f"⏰ {platform_name}: Timeout (>{self.config.get('timeout_per_scraper', 30.0)}s)")
+            logger.warning(f"⏰ {platform_name}: Timeout (>{self.timeout}s)")
             self.failed_scrapers.add(platform_name)
             return False
         except Exception as e:
-            print(f"❌ {platform_name}: Erreur - {str(e)[:100]}...")
+            logger.warning(f"❌ {platform_name}: Erreur - {str(e)[:100]}...")
             self.failed_scrapers.add(platform_name)
             return False
     
+    def _mark_available(self, platform_name: str) -> None:
+        """Ajoute une plateforme fonctionnelle et rafraîchit la vue figée utilisée pour l'itération"""
+        self.available_scrapers.add(platform_name)
+        self.failed_scrapers.discard(platform_name)
+        self._available_platforms = tuple(sorted(self.available_scrapers))
+    
     async def discover_available_scrapers(self):
         """Découvre les scrapers disponibles et fonctionnels"""
-        print("\n🧪 PHASE 1: TEST DE DISPONIBILITÉ DES SCRAPERS")
-        print("=" * 50)
+        logger.info("\n🧪 PHASE 1: TEST DE DISPONIBILITÉ DES SCRAPERS")
+        logger.info("=" * 50)
         
-        for platform_name in self.scrapers.keys():
-            is_available = await self.test_scraper_availability(platform_name)
-            if is_available:
-                self.available_scrapers.append(platform_name)
+        # Tests en parallèle: le démarrage dure le temps du test le plus lent, pas leur somme
+        platforms = list(self.scrapers)
+        results = await asyncio.gather(
+            *(self.test_scraper_availability(platform_name) for platform_name in platforms),
+            return_exceptions=True
+        )
+        for platform_name, is_available in zip(platforms, results):
+            if is_available is True:
+                self._mark_available(platform_name)
+            else:
+                self.failed_scrapers.add(platform_name)
         
         if not self.available_scrapers:
             raise Exception("❌ Aucun scraper disponible !")
         
-        print(f"\n✅ Scrapers disponibles: {self.available_scrapers}")
+        logger.info(f"\n✅ Scrapers disponibles: {list(self._available_platforms)}")
+    
+    def _should_retry(self, error: Exception) -> bool:
+        """Indique si l'erreur est transitoire (timeout, réseau, 429, 5xx) et mérite une nouvelle tentative"""
+        if isinstance(error, (asyncio.TimeoutError, httpx.TransportError, ConnectionError)):
+            return True
+        if isinstance(error, httpx.HTTPStatusError):
+            status = error.response.status_code
+            return status == 429 or status >= 500
+        return False
     
-    async def scrape_term_on_platform(self, term: str, platform: str, attempt: int = 1) -> List[Dict]:
-        """Scrape un terme sur une plateforme avec retry"""
-        max_retries = self.config.get("max_retries", 3)
-        max_results = self.config.get("maxResults", 50)
+    def _retry_delay(self, attempt: int) -> float:
+        """Backoff exponentiel plafonné avec gigue aléatoire"""
+        base_pause, max_pause = self.retry_pause_min, self.retry_pause_max
+        return min(self.max_retry_delay, base_pause * 2 ** attempt) + random.uniform(0, max_pause - base_pause)
+    
+    async def scrape_term_on_platform(self, term: str, platform: str) -> List[Dict]:
+        """Scrape un terme sur une plateforme en passant par les caches de résultats"""
+        cache_key = (platform, term)
         
-        try:
-            print(f"🔍 {platform} pour '{term}' (tentative {attempt}/{max_retries})...")
-            
-            scraper_class = self.scrapers[platform]
-            async with scraper_class(max_results=max_results) as scraper:
+        # Résultats déjà obtenus lors d'un cycle précédent
+        cached = self._results_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < self.cache_ttl:
+            logger.info(f"♻️ {platform} pour '{term}': {len(cached[1])} produits depuis le cache")
+            return [dict(product) for product in cached[1]]
+        
+        # Couple récemment vide ou en échec: on ne relance pas de requête
+        failed_at = self._negative_cache.get(cache_key)
+        if failed_at and time.monotonic() - failed_at < self.negative_cache_ttl:
+            logger.info(f"⏭️ {platform} pour '{term}': échec récent en cache, ignoré")
+            return []
+        
+        products = await self._scrape_with_retry(term, platform)
+        
+        # Seules les requêtes réellement lancées comptent comme recherches (pas les réponses du cache)
+        platform_stats = self.stats["platform_stats"][platform]
+        platform_stats["searches"] += 1
+        if products:
+            platform_stats["successes"] += 1
+        
+        if products:
+            self._results_cache[cache_key] = (time.monotonic(), [dict(product) for product in products])
+        else:
+            # Vide ou échec définitif: mis en cache négatif pour ne pas relancer tout de suite
+            self._negative_cache[cache_key] = time.monotonic()
+        return products
+    
+    async def _scrape_with_retry(self, term: str, platform: str) -> List[Dict]:
+        """Lance la recherche avec des tentatives successives dans une boucle plate"""
+        max_retries = self.max_retries
+        scraper = self.scraper_instances[platform]
+        
+        for attempt in range(max_retries):
+            if attempt > 0:
+                self.stats["retries"] += 1
+            try:
+                logger.info(f"🔍 {platform} pour '{term}' (tentative {attempt + 1}/{max_retries})...")
+                
                 products = await asyncio.wait_for(
                     scraper.search_products(term),
-                    timeout=self.config.get("timeout_per_scraper", 30.0)
+                    timeout=self.timeout
                 )
                 
-                if products:
-                    print(f"📦 {platform}: {len(products)} produits récupérés")
-                    # Convertir les objets Product en dictionnaires si nécessaire
-                    products_dict = []
-                    for product in products:
-                        if hasattr(product, '__dict__'):
-                            products_dict.append(product.__dict__)
-                        else:
-                            products_dict.append(product)
-                    return products_dict
+                if not products:
+                    logger.warning(f"⚠️ {platform}: Aucun produit trouvé")
+                    return []
+                
+                logger.info(f"📦 {platform}: {len(products)} produits récupérés")
+                # Convertir les objets Product (dataclasses) en dictionnaires si nécessaire
+                return [asdict(product) if is_dataclass(product) else product for product in products]
+                
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    logger.warning(f"⏰ {platform}: Timeout")
                 else:
-                    print(f"⚠️ {platform}: Aucun produit trouvé")
+                    logger.warning(f"❌ {platform}: Erreur - {str(e)[:100]}...")
+                
+                # Pas de nouvelle tentative sur une erreur permanente ou au dernier essai
+                if attempt == max_retries - 1 or not self._should_retry(e):
                     return []
-                    
-        except asyncio.TimeoutError:
-            print(f"⏰ {platform}: Timeout")
-            if attempt < max_retries:
-                pause_range = self.config.get("pause_between_retries", (2.0, 5.0))
-                pause = random.uniform(*pause_range)
-                await asyncio.sleep(pause)
-                return await self.scrape_term_on_platform(term, platform, attempt + 1)
-            return []
-            
-        except Exception as e:
-            print(f"❌ {platform}: Erreur - {str(e)[:100]}...")
-            if attempt < max_retries:
-                pause_range = self.config.get("pause_between_retries", (2.0, 5.0))
-                pause = random.uniform(*pause_range)
-                await asyncio.sleep(pause)
-                return await self.scrape_term_on_platform(term, platform, attempt + 1)
-            return []
+                
+                delay = self._retry_delay(attempt)
+                logger.info(f"⏳ Nouvelle tentative dans {delay:.1f}s...")
+                await asyncio.sleep(delay)
+        
+        return []
     
-    async def scrape_term_all_platforms(self, term: str) -> List[Dict]:
-        """Scrape un terme sur toutes les plateformes disponibles"""
-        print(f"\n🚀 Scraping multi-plateforme pour '{term}'...")
+    def _is_cached(self, platform: str, term: str) -> bool:
+        """Indique si le couple serait servi par le cache de résultats ou le cache négatif, sans requête"""
+        now = time.monotonic()
+        cached = self._results_cache.get((platform, term))
+        if cached and now - cached[0] < self.cache_ttl:
+            return True
+        failed_at = self._negative_cache.get((platform, term))
+        return bool(failed_at and now - failed_at < self.negative_cache_ttl)
+    
+    def _has_fresh_searches(self) -> bool:
+        """Indique si un cycle lancerait au moins une vraie requête (sinon il ne rapporterait que des doublons)"""
+        return any(
+            not self._is_cached(platform, term)
+            for term in self.search_terms
+            for platform in self._available_platforms
+        )
+    
+    async def _scrape_platform_bounded(self, term: str, platform: str) -> List[Dict]:
+        """Scrape un terme sur une plateforme en respectant la limite de concurrence"""
+        async with self.platform_semaphore:
+            return await self.scrape_term_on_platform(term, platform)
+    
+    async def scrape_term_all_platforms(self, term: str) -> tuple:
+        """Scrape un terme sur toutes les plateformes disponibles.
+        
+        Retourne les produits nouveaux (doublons retirés plateforme par plateforme) et le nombre de doublons ignorés.
+        """
+        logger.info(f"\n🚀 Scraping multi-plateforme pour '{term}'...")
         
         all_products = []
+        duplicates = 0
+        platforms = self._available_platforms
         
-        # Scraping séquentiel pour éviter la surcharge
-        for platform in self.available_scrapers:
-            products = await self.scrape_term_on_platform(term, platform)
+        # Scraping parallèle : la durée par terme est celle de la plateforme la plus lente
+        results = await asyncio.gather(
+            *(self._scrape_platform_bounded(term, platform) for platform in platforms),
+            return_exceptions=True
+        )
+        
+        # Horodatage commun à tout le lot
+        scraped_at = datetime.now().isoformat()
+        
+        for platform, products in zip(platforms, results):
+            if isinstance(products, Exception):
+                logger.warning(f"❌ {platform}: Erreur - {str(products)[:100]}...")
+                products = []
             
             # Ajouter métadonnées
             for product in products:
                 product['search_term'] = term
                 product['platform'] = platform
-                product['scraped_at'] = datetime.now().isoformat()
+                product['scraped_at'] = scraped_at
             
-            all_products.extend(products)
+            # Dédoublonnage avant comptage: les stats par plateforme restent cohérentes avec le total
+            unique = self._drop_duplicates(products)
+            duplicates += len(products) - len(unique)
+            all_products.extend(unique)
             
             # Mise à jour des stats
-            if platform not in self.stats["platform_stats"]:
-                self.stats["platform_stats"][platform] = {"products": 0, "searches": 0, "successes": 0}
-            
-            self.stats["platform_stats"][platform]["searches"] += 1
-            self.stats["platform_stats"][platform]["products"] += len(products)
-            if products:
-                self.stats["platform_stats"][platform]["successes"] += 1
+            self.stats["platform_stats"][platform]["products"] += len(unique)
         
-        return all_products
+        return all_products, duplicates
+    
+    async def _scrape_term_bounded(self, term: str, semaphore: asyncio.Semaphore):
+        """Scrape un terme en occupant un créneau de concurrence"""
+        async with semaphore:
+            return (term, *await self.scrape_term_all_platforms(term))
     
     async def run_mass_scraping(self):
         """Exécute le scraping massif principal"""
         self.stats["start_time"] = datetime.now()
+        started = time.monotonic()  # Horloge monotone pour la durée, insensible aux ajustements NTP
         
-        print("\n🚀 PHASE 2: SCRAPING MASSIF")
-        print("=" * 50)
-        print(f"📋 Termes de recherche: {len(self.config.get('search_terms', []))}")
-        print(f"🏪 Plateformes actives: {self.available_scrapers}")
+        logger.info("\n🚀 PHASE 2: SCRAPING MASSIF")
+        logger.info("=" * 50)
+        logger.info(f"📋 Termes de recherche: {len(self.search_terms)}")
+        logger.info(f"🏪 Plateformes actives: {list(self._available_platforms)}")
         
         term_count = 0
         cycle_count = 1
+        semaphore = asyncio.Semaphore(self.concurrency)
         
-        while self.total_products < self.config.get("target_products", 500):
-            print(f"\n🔄 CYCLE {cycle_count}")
-            print("=" * 60)
+        while self.total_products < self.target_products:
+            # Tout serait servi par les caches: un nouveau cycle n'apporterait aucun produit
+            if not self._has_fresh_searches():
+                logger.info("♻️ Toutes les recherches sont en cache: aucun nouveau produit possible, arrêt des cycles")
+                break
             
-            for i, term in enumerate(self.config.get("search_terms", [])):
-                if self.total_products >= self.config.get("target_products", 500):
-                    break
-                
-                term_count += 1
-                print(f"\n{'=' * 60}")
-                print(f"🔍 TERME {term_count}: '{term}'")
-                print("=" * 60)
-                
-                # Scraping du terme
-                products = await self.scrape_term_all_platforms(term)
-                
-                if products:
-                    print(f"✅ Total pour '{term}': {len(products)} produits")
-                    self.all_products.extend(products)
-                    self.total_products += len(products)
-                    print(f"✅ {len(products)} produits ajoutés (Total: {self.total_products})")
+            logger.info(f"\n🔄 CYCLE {cycle_count}")
+            logger.info("=" * 60)
+            
+            # Tous les termes du cycle sont lancés, la concurrence est bornée par le sémaphore
+            tasks = [
+                asyncio.create_task(self._scrape_term_bounded(term, semaphore))
+                for term in self.search_terms
+            ]
+            
+            try:
+                for next_result in asyncio.as_completed(tasks):
+                    term, products, duplicates = await next_result
                     
-                    # Stats par terme
-                    self.stats["term_stats"][term] = self.stats["term_stats"].get(term, 0) + len(products)
-                    self.stats["successful_searches"] += 1
-                else:
-                    print(f"❌ Aucun produit pour '{term}'")
-                    self.stats["failed_searches"] += 1
-                
-                # Pause entre termes (sauf si dernier terme)
-                search_terms = self.config.get("search_terms", [])
-                if i < len(search_terms) - 1 and self.total_products < self.config.get("target_products", 500):
-                    pause_range = self.config.get("pause_between_terms", (3.0, 7.0))
-                    pause = random.uniform(*pause_range)
-                    print(f"⏳ Pause inter-terme: {pause:.1f}s...")
-                    await asyncio.sleep(pause)
+                    term_count += 1
+                    logger.info(f"\n{'=' * 60}")
+                    logger.info(f"🔍 TERME {term_count}: '{term}'")
+                    logger.info("=" * 60)
+                    
+                    if products:
+                        logger.info(f"✅ Total pour '{term}': {len(products)} produits ({duplicates} doublons ignorés)")
+                        await Actor.push_data(products)
+                        self.recent_products.extend(products)
+                        for product in products:
+                            self._update_price_stats(product)
+                        self.total_products += len(products)
+                        logger.info(f"✅ {len(products)} produits ajoutés (Total: {self.total_products})")
+                        
+                        # Stats par terme
+                        self.stats["term_stats"][term] += len(products)
+                        self.stats["successful_searches"] += 1
+                    elif duplicates:
+                        # Uniquement des doublons: ni succès ni échec
+                        logger.info(f"♻️ Aucun nouveau produit pour '{term}' ({duplicates} doublons ignorés)")
+                    else:
+                        logger.warning(f"❌ Aucun produit pour '{term}'")
+                        self.stats["failed_searches"] += 1
+                    
+                    # Objectif atteint: inutile d'attendre les termes restants
+                    if self.total_products >= self.target_products:
+                        break
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
             
             cycle_count += 1
             
             # Sécurité: éviter les boucles infinies
             if cycle_count > 10:
-                print("⚠️ Limite de cycles atteinte")
+                logger.warning("⚠️ Limite de cycles atteinte")
                 break
         
         self.stats["end_time"] = datetime.now()
-        self.stats["duration"] = (self.stats["end_time"] - self.stats["start_time"]).total_seconds()
+        self.stats["duration"] = time.monotonic() - started
         self.stats["total_products"] = self.total_products
     
     def generate_report(self) -> str:
@@ -327,12 +488,17 @@ class MassScrapingManager:
         report.append(f"📦 Produits récupérés: {self.total_products}")
         report.append(f"✅ Recherches réussies: {self.stats['successful_searches']}")
         report.append(f"❌ Recherches échouées: {self.stats['failed_searches']}")
+        report.append(f"🔁 Nouvelles tentatives: {self.stats['retries']}")
+        duplicates = self.stats["duplicates_skipped"]
+        scraped = self.total_products + duplicates
+        dedup_rate = (duplicates / scraped * 100) if scraped > 0 else 0
+        report.append(f"♻️ Doublons ignorés: {duplicates} ({dedup_rate:.1f}% des produits récupérés)")
         
         report.append("\n" + "=" * 70)
         report.append("📊 RAPPORT COMPLET DE SCRAPING")
         report.append("=" * 70)
         report.append(f"📦 Total produits: {self.total_products}")
-        report.append(f"✅ Scrapers fonctionnels: {self.available_scrapers}")
+        report.append(f"✅ Scrapers fonctionnels: {list(self._available_platforms)}")
         report.append(f"❌ Scrapers défaillants: {list(self.failed_scrapers)}")
         
         # Performance des scrapers
@@ -352,42 +518,29 @@ class MassScrapingManager:
         # Top termes
         if self.stats["term_stats"]:
             report.append("\n🔍 Top termes de recherche:")
-            sorted_terms = sorted(self.stats["term_stats"].items(), key=lambda x: x[1], reverse=True)[:5]
-            for term, count in sorted_terms:
+            for term, count in self.stats["term_stats"].most_common(5):
                 report.append(f"  • '{term}': {count} produits")
         
         # Analyse des prix
-        if self.all_products:
-            prices = []
-            for product in self.all_products:
-                if 'price' in product and product['price']:
-                    try:
-                        # Extraction du prix numérique
-                        price_str = str(product['price']).replace('$', '').replace(',', '')
-                        price = float(price_str)
-                        if 0 < price < 10000:  # Filtrer les prix aberrants
-                            prices.append(price)
-                    except:
-                        continue
-            
-            if prices:
-                report.append("\n💰 Analyse des prix:")
-                report.append(f"  • Prix minimum: ${min(prices):.2f}")
-                report.append(f"  • Prix maximum: ${max(prices):.2f}")
-                report.append(f"  • Prix moyen: ${sum(prices)/len(prices):.2f}")
-                report.append(f"  • Valeur totale: ${sum(prices):.2f}")
+        price_stats = self._price_stats
+        if price_stats["count"]:
+            report.append("\n💰 Analyse des prix:")
+            report.append(f"  • Prix minimum: ${price_stats['min']:.2f}")
+            report.append(f"  • Prix maximum: ${price_stats['max']:.2f}")
+            report.append(f"  • Prix moyen: ${price_stats['sum'] / price_stats['count']:.2f}")
+            report.append(f"  • Valeur totale: ${price_stats['sum']:.2f}")
         
         return "\n".join(report)
     
-    def save_results(self) -> str:
+    async def save_results(self) -> str:
         """Sauvegarde les résultats en JSON"""
         # Créer le dossier de sortie
-        output_dir = Path(CONFIG["output_dir"])
+        output_dir = self.output_dir
         output_dir.mkdir(exist_ok=True)
         
         # Nom du fichier avec timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{CONFIG['results_prefix']}_{timestamp}.json"
+        filename = f"{self.results_prefix}_{timestamp}.json"
         filepath = output_dir / filename
         
         # Données à sauvegarder
@@ -395,30 +548,34 @@ class MassScrapingManager:
             "metadata": {
                 "timestamp": datetime.now().isoformat(),
                 "total_products": self.total_products,
-                "target_products": CONFIG["target_products"],
+                "target_products": self.target_products,
                 "duration_seconds": self.stats["duration"],
-                "available_scrapers": self.available_scrapers,
-                "failed_scrapers": list(self.failed_scrapers)
+                "available_scrapers": list(self._available_platforms),
+                "failed_scrapers": list(self.failed_scrapers),
+                "products_in_file": len(self.recent_products)
             },
             "statistics": self.stats,
-            "products": self.all_products
+            "products": list(self.recent_products)
         }
         
-        # Sauvegarde
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(results_data, f, indent=2, ensure_ascii=False)
+        # Sérialisation orjson puis écriture hors de la boucle d'événements
+        options = orjson.OPT_NON_STR_KEYS
+        if self.pretty_output:
+            options |= orjson.OPT_INDENT_2
+        data = orjson.dumps(results_data, option=options)
+        await asyncio.to_thread(filepath.write_bytes, data)
         
-        print(f"💾 Résultats sauvegardés: {filename}")
+        logger.info(f"💾 Résultats sauvegardés: {filename}")
         return str(filepath)
     
     async def run(self):
         """Point d'entrée principal"""
         try:
-            print("🚀 SCRIPT DE RÉFÉRENCE - SCRAPING MASSIF APIFY")
-            print("=" * 80)
-            print(f"🎯 Objectif: {CONFIG['target_products']} produits")
-            print(f"🔧 Scrapers configurés: {list(self.scrapers.keys())}")
-            print("=" * 80)
+            logger.info("🚀 SCRIPT DE RÉFÉRENCE - SCRAPING MASSIF APIFY")
+            logger.info("=" * 80)
+            logger.info(f"🎯 Objectif: {self.target_products} produits")
+            logger.info(f"🔧 Scrapers configurés: {list(self.scrapers.keys())}")
+            logger.info("=" * 80)
             
             # Phase 1: Tests de disponibilité
             await self.discover_available_scrapers()
@@ -428,36 +585,60 @@ class MassScrapingManager:
             
             # Phase 3: Rapport et sauvegarde
             report = self.generate_report()
-            print(report)
+            logger.info(report)
             
-            filepath = self.save_results()
+            filepath = await self.save_results()
             
             # Résumé final
-            print("\n" + "=" * 80)
-            target_products = self.config.get("target_products", 500)
+            logger.info("\n" + "=" * 80)
+            target_products = self.target_products
             if self.total_products >= target_products:
-                print("🎉 OBJECTIF ATTEINT !")
+                logger.info("🎉 OBJECTIF ATTEINT !")
             else:
-                print("⚠️ OBJECTIF PARTIELLEMENT ATTEINT")
+                logger.warning("⚠️ OBJECTIF PARTIELLEMENT ATTEINT")
             
-            print(f"📊 {self.total_products} produits récupérés (objectif: {target_products})")
-            print(f"📁 Fichier de résultats: {Path(filepath).name}")
-            print("\n🚀 SCRIPT DE RÉFÉRENCE TERMINÉ !")
-            print("⚡ Version optimisée pour Apify Actor")
+            logger.info(f"📊 {self.total_products} produits récupérés (objectif: {target_products})")
+            logger.info(f"📁 Fichier de résultats: {Path(filepath).name}")
+            logger.info("\n🚀 SCRIPT DE RÉFÉRENCE TERMINÉ !")
+            logger.info("⚡ Version optimisée pour Apify Actor")
             
         except KeyboardInterrupt:
-            print("\n⚠️ Interruption utilisateur")
-            if self.all_products:
-                self.save_results()
+            logger.info("\n⚠️ Interruption utilisateur")
+            if self.recent_products:
+                await self.save_results()
         except Exception as e:
-            print(f"\n❌ Erreur critique: {e}")
-            if self.all_products:
-                self.save_results()
+            logger.error(f"\n❌ Erreur critique: {e}")
+            if self.recent_products:
+                await self.save_results()
+
+
+def start_log_listener() -> logging.handlers.QueueListener:
+    """Route les logs du module via une file: les coroutines n'attendent jamais le verrou de stderr"""
+    log_queue: queue.Queue = queue.Queue(-1)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    listener.start()
+    return listener
 
 
 async def main():
     """Fonction principale pour Apify Actor"""
-    start_time = time.time()
+    listener = start_log_listener()
+    try:
+        await _run_actor()
+    finally:
+        # Vide la file avant de rendre la main
+        listener.stop()
+
+
+async def _run_actor():
+    """Exécute l'Actor et sauvegarde métriques et résumé"""
+    start_time = time.monotonic()
     
     async with Actor:
         # Récupérer les inputs Apify
@@ -468,38 +649,44 @@ async def main():
         
         # Créer et exécuter le manager
         manager = MassScrapingManager(config)
-        await manager.run()
+        async with manager:
+            await manager.run()
         
-        # Sauvegarder les résultats dans Apify Dataset
-        if manager.all_products:
-            await Actor.push_data(manager.all_products)
-            print(f"✅ {len(manager.all_products)} produits sauvegardés dans Apify Dataset")
+        # Les produits ont été poussés dans l'Apify Dataset au fil du scraping
+        logger.info(f"✅ {manager.total_products} produits sauvegardés dans Apify Dataset")
         
         # Sauvegarder les métriques
+        target_products = manager.target_products
         metrics = {
             "total_products": manager.total_products,
-            "target_products": config.get("target_products", 500),
-            "platforms_used": list(manager.available_scrapers),
-            "search_terms": config.get("search_terms", []),
-            "success_rate": (manager.total_products / config.get("target_products", 500)) * 100 if config.get("target_products", 500) > 0 else 0
+            "target_products": target_products,
+            "platforms_used": list(manager._available_platforms),
+            "search_terms": manager.search_terms,
+            "success_rate": (manager.total_products / target_products) * 100 if target_products > 0 else 0
         }
         
         await Actor.set_value("METRICS", metrics)
-        print(f"📊 Métriques sauvegardées: {metrics}")
+        logger.info(f"📊 Métriques sauvegardées: {metrics}")
         
         # Sauvegarder un résumé final
         summary = {
-            "execution_time": time.time() - start_time,
+            "execution_time": time.monotonic() - start_time,
             "total_products_scraped": manager.total_products,
-            "target_achieved": manager.total_products >= config.get("target_products", 500),
+            "target_achieved": manager.total_products >= target_products,
             "platforms_tested": len(manager.available_scrapers),
-            "search_terms_processed": len(config.get("search_terms", [])),
+            "search_terms_processed": len(manager.search_terms),
             "timestamp": datetime.now().isoformat()
         }
         
         await Actor.set_value("EXECUTION_SUMMARY", summary)
-        print(f"🎯 Résumé d'exécution sauvegardé: {summary}")
+        logger.info(f"🎯 Résumé d'exécution sauvegardé: {summary}")
 
 
 if __name__ == "__main__":
+    # Boucle d'événements libuv si disponible (Linux), sinon boucle asyncio standard
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     asyncio.run(main())
\ No newline at end of file
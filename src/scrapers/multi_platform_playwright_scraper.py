@@ -2,61 +2,166 @@
 
 import asyncio
 import random
-from typing import List, Optional, Dict, Any
+import re
+from functools import lru_cache
+from typing import List, Dict, Any, Callable
 from datetime import datetime
-from urllib.parse import quote_plus, urljoin
+from urllib.parse import quote_plus
 from playwright.async_api import Page
 
 from src.scrapers.playwright_scraper import PlaywrightScraper
 from src.scrapers.base_scraper import Product
-from src.utils import safe_log
+from src.utils import safe_log, LogFunc
+
+
+# Configuration des plateformes, partagée par toutes les instances
+PLATFORMS_CONFIG: Dict[str, Dict[str, Any]] = {
+    'amazon': {
+        'base_url': 'https://www.amazon.com',
+        'search_path': '/s?k={}',
+        'selectors': (
+            'div[data-component-type="s-search-result"]',
+            'div[data-asin]:not([data-asin=""])',
+            '.s-result-item[data-asin]'
+        ),
+        'title_selectors': ('h2 a span', 'h2 span', '.s-title-instructions-style h2 a span'),
+        'price_selectors': ('.a-price-whole', '.a-price .a-offscreen'),
+        'link_selectors': ('h2 a', '.s-link-style a')
+    },
+    'ebay': {
+        'base_url': 'https://www.ebay.com',
+        'search_path': '/sch/i.html?_nkw={}',
+        'selectors': ('.s-item', '.srp-results .s-item'),
+        'title_selectors': ('.s-item__title', 'h3.s-item__title'),
+        'price_selectors': ('.s-item__price', '.notranslate'),
+        'link_selectors': ('.s-item__link',)
+    },
+    'walmart': {
+        'base_url': 'https://www.walmart.com',
+        'search_path': '/search?q={}',
+        'selectors': ('[data-testid="item-stack"]', '[data-automation-id="product-title"]'),
+        'title_selectors': ('[data-automation-id="product-title"]', 'span[data-automation-id="product-title"]'),
+        'price_selectors': ('[data-testid="product-price"]', '.price-current'),
+        'link_selectors': ('a[data-testid="product-title"]',)
+    },
+    'etsy': {
+        'base_url': 'https://www.etsy.com',
+        'search_path': '/search?q={}',
+        'selectors': ('.v2-listing-card', '.listing-link', '[data-test-id="listing"]'),
+        'title_selectors': ('.listing-link', 'h3.v2-listing-card__title'),
+        'price_selectors': ('.currency-value', '.price'),
+        'link_selectors': ('.listing-link',)
+    }
+}
+
+
+def _combine_selectors(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Fusionne chaque groupe de sélecteurs en une seule liste CSS (une requête DOM par champ).
+    
+    Les conteneurs font exception: leur union ne sert qu'à attendre la page, l'extraction
+    parcourt `containers` dans l'ordre et garde le premier sélecteur qui trouve des nœuds
+    (l'union renverrait aussi les nœuds imbriqués dans un autre conteneur).
+    """
+    return {
+        'container': ', '.join(config['selectors']),
+        'containers': list(config['selectors']),
+        'title': ', '.join(config['title_selectors']),
+        'price': ', '.join(config['price_selectors']),
+        'link': ', '.join(config['link_selectors'])
+    }
+
+
+# Sélecteurs combinés par plateforme, calculés une seule fois au chargement du module
+COMBINED_SELECTORS: Dict[str, Dict[str, Any]] = {
+    platform: _combine_selectors(config) for platform, config in PLATFORMS_CONFIG.items()
+}
+
+
+# Indicateurs de blocage par plateforme
+BLOCKING_INDICATORS: Dict[str, tuple] = {
+    'amazon': ('captcha', 'robot', 'automated', 'blocked'),
+    'ebay': ('blocked', 'access denied', 'security check'),
+    'walmart': ('blocked', 'access denied', 'security'),
+    'etsy': ('blocked', 'access denied', 'captcha')
+}
+DEFAULT_BLOCKING_INDICATORS = ('blocked', 'access denied')
+
+
+def _compile_indicators(indicators: tuple) -> re.Pattern:
+    """Compile une liste d'indicateurs en une seule alternative: un seul passage sur le texte."""
+    return re.compile('|'.join(map(re.escape, indicators)), re.IGNORECASE)
+
+
+BLOCKING_PATTERNS: Dict[str, re.Pattern] = {
+    platform: _compile_indicators(indicators) for platform, indicators in BLOCKING_INDICATORS.items()
+}
+DEFAULT_BLOCKING_PATTERN = _compile_indicators(DEFAULT_BLOCKING_INDICATORS)
+
+# Sonde légère: titre et début du texte visible, au lieu de sérialiser tout le DOM
+BLOCKING_PROBE_JS = """
+() => (document.title + ' ' + (document.body ? document.body.innerText.slice(0, 4000) : '')).toLowerCase()
+"""
+
+
+# Gabarit d'URL de recherche complet par plateforme (méthode format liée, prête à appeler)
+SEARCH_URL_BUILDERS: Dict[str, Callable[[str], str]] = {
+    platform: (config['base_url'] + config['search_path']).format
+    for platform, config in PLATFORMS_CONFIG.items()
+}
+
+
+@lru_cache(maxsize=1024)
+def build_search_url(platform: str, search_term: str) -> str:
+    """Construit (et mémorise) l'URL de recherche d'un terme sur une plateforme."""
+    return SEARCH_URL_BUILDERS[platform](quote_plus(search_term))
+
+
+# Extraction groupée côté navigateur: un seul aller-retour CDP par page au lieu d'un par champ et par produit.
+# Les conteneurs viennent du premier sélecteur (par ordre de priorité) qui trouve des nœuds.
+# Les textes sont nettoyés dans le navigateur (espaces normalisés, titre tronqué à 200 caractères),
+# les liens et images rendus absolus par le parseur d'URL natif, et seuls les `limit` premiers
+# conteneurs sont extraits et sérialisés.
+EXTRACT_PRODUCTS_JS = """
+({containers, title, price, link, limit}) => {
+    let nodes = [];
+    for (const selector of containers) {
+        nodes = document.querySelectorAll(selector);
+        if (nodes.length) {
+            break;
+        }
+    }
+    return Array.from(nodes).slice(0, limit).map((node) => {
+        const clean = (el) => el ? el.innerText.replace(/\\s+/g, ' ').trim() : '';
+        const absolute = (el, attr) => {
+            const value = el ? el.getAttribute(attr) : null;
+            try {
+                return value ? new URL(value, location.href).href : '';
+            } catch (e) {
+                return '';
+            }
+        };
+        return {
+            title: clean(node.querySelector(title)).slice(0, 200),
+            price: clean(node.querySelector(price)),
+            url: absolute(node.querySelector(link), 'href'),
+            image_url: absolute(node.querySelector('img'), 'src'),
+            asin: node.getAttribute('data-asin') || ''
+        };
+    });
+}
+"""
 
 
 class MultiPlatformPlaywrightScraper(PlaywrightScraper):
     """Scraper multi-plateformes utilisant Playwright avec Chromium pour des performances optimales."""
     
-    def __init__(self, max_results: int = 50, headless: bool = True):
-        super().__init__(max_results, headless, use_stealth=True)
-        
-        # Configuration des plateformes
-        self.platforms_config = {
-            'amazon': {
-                'base_url': 'https://www.amazon.com',
-                'search_path': '/s?k={}',
-                'selectors': [
-                    'div[data-component-type="s-search-result"]',
-                    'div[data-asin]:not([data-asin=""])',
-                    '.s-result-item[data-asin]'
-                ],
-                'title_selectors': ['h2 a span', 'h2 span', '.s-title-instructions-style h2 a span'],
-                'price_selectors': ['.a-price-whole', '.a-price .a-offscreen'],
-                'link_selectors': ['h2 a', '.s-link-style a']
-            },
-            'ebay': {
-                'base_url': 'https://www.ebay.com',
-                'search_path': '/sch/i.html?_nkw={}',
-                'selectors': ['.s-item', '.srp-results .s-item'],
-                'title_selectors': ['.s-item__title', 'h3.s-item__title'],
-                'price_selectors': ['.s-item__price', '.notranslate'],
-                'link_selectors': ['.s-item__link']
-            },
-            'walmart': {
-                'base_url': 'https://www.walmart.com',
-                'search_path': '/search?q={}',
-                'selectors': ['[data-testid="item-stack"]', '[data-automation-id="product-title"]'],
-                'title_selectors': ['[data-automation-id="product-title"]', 'span[data-automation-id="product-title"]'],
-                'price_selectors': ['[data-testid="product-price"]', '.price-current'],
-                'link_selectors': ['a[data-testid="product-title"]']
-            },
-            'etsy': {
-                'base_url': 'https://www.etsy.com',
-                'search_path': '/search?q={}',
-                'selectors': ['.v2-listing-card', '.listing-link', '[data-test-id="listing"]'],
-                'title_selectors': ['.listing-link', 'h3.v2-listing-card__title'],
-                'price_selectors': ['.currency-value', '.price'],
-                'link_selectors': ['.listing-link']
-            }
-        }
+    platforms_config = PLATFORMS_CONFIG
+    
+    # Délai maximum (secondes) de navigation + extraction sur une plateforme, hors attente d'une page libre
+    PLATFORM_TIMEOUT = 90.0
+    
+    def __init__(self, max_results: int = 50, headless: bool = True, logger: LogFunc = safe_log):
+        super().__init__(max_results, headless, use_stealth=True, logger=logger)
     
     def get_platform_name(self) -> str:
         return 'MultiPlatform-Playwright'
@@ -64,12 +169,15 @@ class MultiPlatformPlaywrightScraper(PlaywrightScraper):
     async def search_all_platforms(self, search_term: str) -> Dict[str, List[Product]]:
         """Recherche sur toutes les plateformes en parallèle."""
         results = {}
+        # Hors d'un bloc async with, le navigateur est lancé puis fermé pour cette seule recherche
+        owns_browser = self.browser is None
         
         try:
-            await safe_log('info', f"Démarrage de la recherche multi-plateformes pour: {search_term}")
+            await self._log('info', f"Démarrage de la recherche multi-plateformes pour: {search_term}")
             
-            # Initialisation du navigateur
-            await self.init_browser()
+            # Initialisation du navigateur si nécessaire
+            if owns_browser:
+                await self.init_browser()
             
             # Recherche en parallèle sur toutes les plateformes
             tasks = []
@@ -84,17 +192,18 @@ class MultiPlatformPlaywrightScraper(PlaywrightScraper):
             for i, platform in enumerate(self.platforms_config.keys()):
                 result = platform_results[i]
                 if isinstance(result, Exception):
-                    await safe_log('error', f"Erreur pour {platform}: {result}")
+                    await self._log('error', f"Erreur pour {platform}: {result}")
                     results[platform] = []
                 else:
                     results[platform] = result
-                    await safe_log('info', f"{platform}: {len(result)} produits trouvés")
+                    await self._log('info', f"{platform}: {len(result)} produits trouvés")
             
         except Exception as e:
-            await safe_log('error', f"Erreur lors de la recherche multi-plateformes: {e}")
+            await self._log('error', f"Erreur lors de la recherche multi-plateformes: {e}")
         
         finally:
-            await self.close()
+            if owns_browser:
+                await self.close()
         
         return results
     
@@ -103,35 +212,46 @@ class MultiPlatformPlaywrightScraper(PlaywrightScraper):
         products = []
         
         try:
-            config = self.platforms_config[platform]
-            search_url = config['base_url'] + config['search_path'].format(quote_plus(search_term))
+            search_url = build_search_url(platform, search_term)
             
-            await safe_log("info", f"Recherche sur {platform}: {search_url}")
+            await self._log("info", f"Recherche sur {platform}: {search_url}")
             
-            # Création d'une page dédiée
-            page = await self.create_page()
-            
-            # Configuration spécifique par plateforme
-            await self._configure_page_for_platform(page, platform)
-            
-            # Navigation
-            if await self.navigate_with_retry(page, search_url):
-                # Vérification de blocage
-                if await self._check_platform_blocking(page, platform):
-                    await safe_log("warning", f"Blocage détecté sur {platform}")
-                    await page.close()
-                    return products
-                
-                # Extraction des produits
-                products = await self._extract_platform_products(page, platform)
-                
-            await page.close()
+            # Nombre de pages simultanées borné; les pages sont réutilisées via le pool
+            async with self._page_sem:
+                page = await self.acquire_page()
+                try:
+                    # Le délai ne court qu'une fois la page obtenue: l'attente du sémaphore n'est pas comptée
+                    products = await asyncio.wait_for(
+                        self._search_on_page(page, platform, search_url), timeout=self.PLATFORM_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    await self._log("warning", f"{platform}: délai de {self.PLATFORM_TIMEOUT:.0f}s dépassé, recherche abandonnée")
+                finally:
+                    await self.release_page(page)
             
         except Exception as e:
-            await safe_log("error", f"Erreur lors de la recherche sur {platform}: {e}")
+            await self._log("error", f"Erreur lors de la recherche sur {platform}: {e}")
         
         return products[:self.max_results]
     
+    async def _search_on_page(self, page: Page, platform: str, search_url: str) -> List[Product]:
+        """Navigue vers la recherche puis extrait les produits, sur une page déjà obtenue du pool."""
+        # Configuration spécifique par plateforme
+        await self._configure_page_for_platform(page, platform)
+        
+        # Navigation
+        if not await self.navigate_with_retry(page, search_url,
+                                              ready_selector=COMBINED_SELECTORS[platform]['container']):
+            return []
+        
+        # Vérification de blocage
+        if await self._check_platform_blocking(page, platform):
+            await self._log("warning", f"Blocage détecté sur {platform}")
+            return []
+        
+        # Extraction des produits
+        return await self._extract_platform_products(page, platform)
+    
     async def _configure_page_for_platform(self, page: Page, platform: str) -> None:
         """Configure la page selon la plateforme."""
         try:
@@ -160,45 +280,23 @@ class MultiPlatformPlaywrightScraper(PlaywrightScraper):
             if headers:
                 await page.set_extra_http_headers(headers)
             
-            # Scripts spécifiques par plateforme
-            if platform == 'amazon':
-                await page.add_init_script("""
-                    // Masquer les indicateurs d'automation spécifiques à Amazon
-                    Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
-                    Object.defineProperty(navigator, 'plugins', { get: () => [1, 2, 3, 4, 5] });
-                """)
+            # Les masquages anti-automation (webdriver, plugins) sont injectés au niveau du contexte
             
         except Exception as e:
-            await safe_log("error", f"Erreur lors de la configuration pour {platform}: {e}")
+            await self._log("error", f"Erreur lors de la configuration pour {platform}: {e}")
     
     async def _check_platform_blocking(self, page: Page, platform: str) -> bool:
         """Vérifie si la plateforme bloque l'accès."""
         try:
-            page_content = await page.content()
-            page_text = page_content.lower()
+            page_text = await page.evaluate(BLOCKING_PROBE_JS)
             
-            # Indicateurs de blocage par plateforme
-            blocking_indicators = {
-                'amazon': ['captcha', 'robot', 'automated', 'blocked'],
-                'ebay': ['blocked', 'access denied', 'security check'],
-                'walmart': ['blocked', 'access denied', 'security'],
-                'etsy': ['blocked', 'access denied', 'captcha']
-            }
-            
-            indicators = blocking_indicators.get(platform, ['blocked', 'access denied'])
+            pattern = BLOCKING_PATTERNS.get(platform, DEFAULT_BLOCKING_PATTERN)
             
-            for indicator in indicators:
-                if indicator in page_text:
-                    return True
-            
-            # Vérification des codes de statut d'erreur
-            if any(error in page_text for error in ['403', '503', '429']):
-                return True
-            
-            return False
+            # Les statuts d'erreur (403, 429, 503...) sont déjà rejetés par navigate_with_retry
+            return pattern.search(page_text) is not None
             
         except Exception as e:
-            await safe_log("error", f"Erreur lors de la vérification de blocage pour {platform}: {e}")
+            await self._log("error", f"Erreur lors de la vérification de blocage pour {platform}: {e}")
             return False
     
     async def _extract_platform_products(self, page: Page, platform: str) -> List[Product]:
@@ -206,106 +304,40 @@ class MultiPlatformPlaywrightScraper(PlaywrightScraper):
         products = []
         
         try:
-            config = self.platforms_config[platform]
-            
-            # Attendre le chargement
-            await page.wait_for_timeout(3000)
-            
-            # Essayer différents sélecteurs
-            for selector in config['selectors']:
-                try:
-                    elements = await page.query_selector_all(selector)
-                    if elements:
-                        await safe_log("info", f"{platform}: Trouvé {len(elements)} éléments avec {selector}")
-                        
-                        for element in elements[:self.max_results]:
-                            product = await self._extract_product_from_platform_element(
-                                element, platform, config
-                            )
-                            if product:
-                                products.append(product)
-                        
-                        if products:
-                            break
-                            
-                except Exception as e:
-                    await safe_log("error", f"Erreur avec le sélecteur {selector} sur {platform}: {e}")
-                    continue
+            # Tous les champs de tous les produits en un seul appel
+            rows = await page.evaluate(
+                EXTRACT_PRODUCTS_JS, {**COMBINED_SELECTORS[platform], 'limit': self.max_results}
+            )
+            if rows:
+                await self._log("info", f"{platform}: Trouvé {len(rows)} éléments")
+                
+                # Horodatage commun à tout le lot
+                scraped_at = datetime.now()
+                products = [
+                    self._build_platform_product(row, platform, scraped_at)
+                    for row in rows
+                ]
             
         except Exception as e:
-            await safe_log("error", f"Erreur lors de l'extraction sur {platform}: {e}")
+            await self._log("error", f"Erreur lors de l'extraction sur {platform}: {e}")
         
         return products
     
-    async def _extract_product_from_platform_element(self, element, platform: str, config: Dict) -> Optional[Product]:
-        """Extrait un produit à partir d'un élément selon la plateforme."""
-        try:
-            # Extraction du titre
-            title = "Titre non trouvé"
-            for selector in config['title_selectors']:
-                title_element = await element.query_selector(selector)
-                if title_element:
-                    title = await title_element.inner_text()
-                    if title and title.strip():
-                        break
-            
-            # Extraction du prix
-            price = "Prix non trouvé"
-            for selector in config['price_selectors']:
-                price_element = await element.query_selector(selector)
-                if price_element:
-                    price = await price_element.inner_text()
-                    if price and price.strip():
-                        break
-            
-            # Extraction de l'URL
-            url = ""
-            for selector in config['link_selectors']:
-                link_element = await element.query_selector(selector)
-                if link_element:
-                    href = await link_element.get_attribute('href')
-                    if href:
-                        if href.startswith('http'):
-                            url = href
-                        else:
-                            url = urljoin(config['base_url'], href)
-                        break
-            
-            # Extraction de l'image
-            image_url = ""
-            img_element = await element.query_selector('img')
-            if img_element:
-                src = await img_element.get_attribute('src')
-                if src:
-                    image_url = src if src.startswith('http') else urljoin(config['base_url'], src)
-            
-            # Extraction de l'ASIN (pour Amazon)
-            asin = ""
-            if platform == 'amazon':
-                asin_attr = await element.get_attribute('data-asin')
-                if asin_attr:
-                    asin = asin_attr
-            
-            # Nettoyage des données
-            title = title.strip()[:200] if title else "Titre non disponible"
-            price = price.strip() if price else "Prix non disponible"
-            
-            return Product(
-                title=title,
-                price=price,
-                currency="USD",
-                url=url,
-                image_url=image_url,
-                rating="",
-                reviews_count="",
-                asin=asin,
-                availability="En stock",
-                scraped_at=datetime.now()
-            )
-            
-        except Exception as e:
-            await safe_log("error", f"Erreur lors de l'extraction du produit sur {platform}: {e}")
-            return None
+    def _build_platform_product(self, row: Dict[str, str], platform: str, scraped_at: datetime) -> Product:
+        """Construit un produit à partir des champs déjà nettoyés renvoyés par le navigateur."""
+        return Product(
+            title=row['title'] or "Titre non disponible",
+            price=row['price'] or "Prix non disponible",
+            currency="USD",
+            url=row['url'],
+            image_url=row['image_url'],
+            rating="",
+            reviews_count="",
+            asin=row['asin'] if platform == 'amazon' else "",
+            availability="En stock",
+            platform=platform,
+            scraped_at=scraped_at
+        )
     
     async def search_products(self, search_term: str) -> List[Product]:
         """Recherche sur toutes les plateformes et retourne tous les produits."""
@@ -321,14 +353,17 @@ class MultiPlatformPlaywrightScraper(PlaywrightScraper):
     async def search_specific_platform(self, platform: str, search_term: str) -> List[Product]:
         """Recherche sur une plateforme spécifique."""
         if platform not in self.platforms_config:
-            await safe_log("warning", f"Plateforme {platform} non supportée")
+            await self._log("warning", f"Plateforme {platform} non supportée")
             return []
         
+        owns_browser = self.browser is None
         try:
-            await self.init_browser()
-            products = await self._search_platform(platform, search_term)
-            await self.close()
-            return products
+            if owns_browser:
+                await self.init_browser()
+            return await self._search_platform(platform, search_term)
         except Exception as e:
-            await safe_log("error", f"Erreur lors de la recherche sur {platform}: {e}")
-            return []
\ No newline at end of file
+            await self._log("error", f"Erreur lors de la recherche sur {platform}: {e}")
+            return []
+        finally:
+            if owns_browser:
+                await self.close()
\ No newline at end of file
@@ -1,13 +1,16 @@
 """Scraper utilisant Playwright avec Chromium pour des performances optimales."""
 
 import asyncio
+import itertools
 import random
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, ClassVar, Iterator, Tuple
 from datetime import datetime
+from types import MappingProxyType
 from urllib.parse import quote_plus, urljoin
 from bs4 import BeautifulSoup
 from apify import Actor
-from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright, Route
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 try:
     from playwright_stealth import stealth_async
     STEALTH_AVAILABLE = True
@@ -16,62 +19,150 @@ except ImportError:
     stealth_async = None
 
 from src.scrapers.base_scraper import BaseScraper, Product
-from src.utils import safe_log
+from src.utils import safe_log, LogFunc
+
+# Script anti-détection injecté dans toutes les pages du contexte
+STEALTH_JS = """
+// Masquer les propriétés WebDriver
+Object.defineProperty(navigator, 'webdriver', {
+    get: () => undefined,
+});
+
+// Masquer les propriétés Playwright
+delete window.playwright;
+delete window.__playwright;
+
+// Simuler des plugins réalistes
+Object.defineProperty(navigator, 'plugins', {
+    get: () => [1, 2, 3, 4, 5],
+});
+
+// Masquer l'automation
+Object.defineProperty(navigator, 'languages', {
+    get: () => ['en-US', 'en'],
+});
+
+// Simuler une résolution d'écran réaliste
+Object.defineProperty(screen, 'width', {
+    get: () => 1920,
+});
+Object.defineProperty(screen, 'height', {
+    get: () => 1080,
+});
+"""
+
+# Sélecteurs CSS des conteneurs de produits par plateforme (table immuable partagée)
+_SELECTORS_MAP = MappingProxyType({
+    'amazon': (
+        'div[data-component-type="s-search-result"]',
+        'div[data-asin]:not([data-asin=""])',
+        '.s-result-item[data-asin]',
+        '[data-cel-widget="search_result"]'
+    ),
+    'ebay': (
+        '.s-item',
+        '.srp-results .s-item',
+        '[data-view="mi:1686|iid:1"]'
+    ),
+    'walmart': (
+        '[data-testid="item-stack"]',
+        '[data-automation-id="product-title"]',
+        '.mb0.ph1.pa0.bb.b--near-white.w-25'
+    ),
+    'etsy': (
+        '.v2-listing-card',
+        '.listing-link',
+        '[data-test-id="listing"]'
+    )
+})
+
+# Ressources inutiles à l'extraction: jamais téléchargées (les attributs src des images restent lisibles dans le DOM)
+BLOCKED_RESOURCE_TYPES = frozenset({'image', 'media', 'font', 'stylesheet'})
+
+# Domaines d'analytics et de tracking
+BLOCKED_DOMAINS = (
+    'google-analytics.com',
+    'googletagmanager.com',
+    'doubleclick.net',
+    'facebook.net',
+    'scorecardresearch.com',
+    'hotjar.com',
+    'criteo.com'
+)
 
 
 class PlaywrightScraper(BaseScraper):
     """Scraper utilisant Playwright avec Chromium pour des performances optimales."""
     
-    def __init__(self, max_results: int = 50, headless: bool = True, use_stealth: bool = True):
-        super().__init__(max_results)
+    # Nombre maximal de pages ouvertes simultanément (et conservées dans le pool)
+    MAX_CONCURRENT_PAGES = 4
+    
+    # Configuration Chromium optimisée pour Apify
+    BROWSER_ARGS: ClassVar[Tuple[str, ...]] = (
+        '--no-sandbox',
+        '--disable-setuid-sandbox',
+        '--disable-dev-shm-usage',
+        '--disable-accelerated-2d-canvas',
+        '--no-first-run',
+        '--disable-gpu',
+        '--disable-background-timer-throttling',
+        '--disable-backgrounding-occluded-windows',
+        '--disable-renderer-backgrounding',
+        '--disable-features=TranslateUI',
+        '--disable-ipc-flooding-protection',
+        '--disable-web-security',
+        '--disable-features=VizDisplayCompositor',
+        '--blink-settings=imagesEnabled=false'
+    )
+    
+    # User agents rotatifs pour éviter la détection, distribués à tour de rôle entre toutes les instances
+    USER_AGENTS: ClassVar[Tuple[str, ...]] = (
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
+    )
+    _user_agent_cycle: ClassVar[Iterator[str]] = itertools.cycle(USER_AGENTS)
+    
+    def __init__(self, max_results: int = 50, headless: bool = True, use_stealth: bool = True,
+                 logger: LogFunc = safe_log):
+        super().__init__(max_results, logger=logger)
         self.headless = headless
         self.use_stealth = use_stealth
+        self._playwright: Optional[Playwright] = None
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
-        
-        # Configuration Chromium optimisée pour Apify
-        self.browser_args = [
-            '--no-sandbox',
-            '--disable-setuid-sandbox',
-            '--disable-dev-shm-usage',
-            '--disable-accelerated-2d-canvas',
-            '--no-first-run',
-            '--no-zygote',
-            '--single-process',
-            '--disable-gpu',
-            '--disable-background-timer-throttling',
-            '--disable-backgrounding-occluded-windows',
-            '--disable-renderer-backgrounding',
-            '--disable-features=TranslateUI',
-            '--disable-ipc-flooding-protection',
-            '--disable-web-security',
-            '--disable-features=VizDisplayCompositor'
-        ]
-        
-        # User agents rotatifs pour éviter la détection
-        self.user_agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
-        ]
+        self._page_sem = asyncio.Semaphore(self.MAX_CONCURRENT_PAGES)
+        self._page_pool: asyncio.Queue = asyncio.Queue(maxsize=self.MAX_CONCURRENT_PAGES)
+    
+    async def __aenter__(self):
+        """Lance le navigateur une seule fois: il est réutilisé par toutes les recherches jusqu'à la sortie."""
+        await super().__aenter__()
+        if not self.browser:
+            await self.init_browser()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Ferme le navigateur puis la session HTTP."""
+        await self.close()
+        await super().__aexit__(exc_type, exc_val, exc_tb)
     
     async def init_browser(self) -> None:
         """Initialise le navigateur Chromium avec Playwright."""
         try:
-            playwright = await async_playwright().start()
+            self._playwright = await async_playwright().start()
             
             # Lancement de Chromium avec configuration optimisée
-            self.browser = await playwright.chromium.launch(
+            self.browser = await self._playwright.chromium.launch(
                 headless=self.headless,
-                args=self.browser_args,
+                args=self.BROWSER_ARGS,
                 slow_mo=random.randint(50, 150)  # Délai aléatoire pour simuler un comportement humain
             )
             
             # Création du contexte avec empreinte digitale réaliste
             self.context = await self.browser.new_context(
-                user_agent=random.choice(self.user_agents),
+                user_agent=next(self._user_agent_cycle),
                 viewport={'width': 1920, 'height': 1080},
                 locale='en-US',
                 timezone_id='America/New_York',
@@ -91,12 +182,26 @@ class PlaywrightScraper(BaseScraper):
                 }
             )
             
-            await safe_log("info", "Navigateur Chromium initialisé avec succès")
+            # Scripts anti-détection injectés une fois pour toutes les pages du contexte
+            await self.context.add_init_script(STEALTH_JS)
+            
+            # Filtrage réseau au niveau du contexte: s'applique à toutes les pages
+            await self.context.route("**/*", self._route_filter)
+            
+            await self._log("info", "Navigateur Chromium initialisé avec succès")
             
         except Exception as e:
-            await safe_log("error", f"Erreur lors de l'initialisation du navigateur: {e}")
+            await self._log("error", f"Erreur lors de l'initialisation du navigateur: {e}")
             raise
     
+    async def _route_filter(self, route: Route) -> None:
+        """Interrompt les requêtes d'images, polices, médias, feuilles de style et trackers."""
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or any(domain in request.url for domain in BLOCKED_DOMAINS):
+            await route.abort()
+        else:
+            await route.continue_()
+    
     async def create_page(self) -> Page:
         """Crée une nouvelle page avec configuration anti-détection."""
         if not self.context:
@@ -109,37 +214,7 @@ class PlaywrightScraper(BaseScraper):
             try:
                 await stealth_async(page)
             except Exception as e:
-                await safe_log("warning", f"Erreur stealth (ignorée): {e}")
-        
-        # Injection de scripts anti-détection
-        await page.add_init_script("""
-            // Masquer les propriétés WebDriver
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined,
-            });
-            
-            // Masquer les propriétés Playwright
-            delete window.playwright;
-            delete window.__playwright;
-            
-            // Simuler des plugins réalistes
-            Object.defineProperty(navigator, 'plugins', {
-                get: () => [1, 2, 3, 4, 5],
-            });
-            
-            // Masquer l'automation
-            Object.defineProperty(navigator, 'languages', {
-                get: () => ['en-US', 'en'],
-            });
-            
-            // Simuler une résolution d'écran réaliste
-            Object.defineProperty(screen, 'width', {
-                get: () => 1920,
-            });
-            Object.defineProperty(screen, 'height', {
-                get: () => 1080,
-            });
-        """)
+                await self._log("warning", f"Erreur stealth (ignorée): {e}")
         
         # Configuration des timeouts
         page.set_default_timeout(30000)  # 30 secondes
@@ -147,48 +222,82 @@ class PlaywrightScraper(BaseScraper):
         
         return page
     
-    async def navigate_with_retry(self, page: Page, url: str, max_retries: int = 3) -> bool:
-        """Navigue vers une URL avec retry automatique."""
+    async def acquire_page(self) -> Page:
+        """Retourne une page libre du pool, ou en crée une nouvelle si le pool est vide."""
+        try:
+            return self._page_pool.get_nowait()
+        except asyncio.QueueEmpty:
+            return await self.create_page()
+    
+    async def release_page(self, page: Page) -> None:
+        """Vide la page et la remet dans le pool (ou la ferme si elle est inutilisable ou le pool plein)."""
+        try:
+            await page.goto('about:blank')
+            self._page_pool.put_nowait(page)
+        except Exception:
+            await page.close()
+    
+    async def navigate_with_retry(self, page: Page, url: str, max_retries: int = 3,
+                                  ready_selector: Optional[str] = None) -> bool:
+        """Navigue vers une URL avec retry automatique.
+        
+        La navigation rend la main dès la réponse reçue ('commit'); si `ready_selector` est fourni,
+        on attend ensuite que ce sélecteur soit présent plutôt que l'exécution de tous les scripts.
+        Seules les erreurs de transport et les statuts HTTP >= 400 déclenchent une nouvelle tentative.
+        """
         for attempt in range(max_retries):
             try:
                 # Délai aléatoire entre les tentatives
                 if attempt > 0:
                     await asyncio.sleep(random.uniform(2, 5))
                 
-                # Navigation avec attente du chargement complet
-                response = await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+                # Navigation sans attendre les scripts tiers
+                response = await page.goto(url, wait_until='commit', timeout=30000)
                 
                 if response and response.status < 400:
-                    # Attente supplémentaire pour le JavaScript
-                    await page.wait_for_timeout(random.randint(1000, 3000))
+                    # Pas d'attente fixe: seulement la présence du contenu utile. S'il n'apparaît pas
+                    # (blocage, CAPTCHA, aucun résultat), l'appelant fait ses propres vérifications:
+                    # renaviguer ne servirait qu'à solliciter à nouveau un site qui bloque
+                    if ready_selector and not await self.wait_for_products(page, ready_selector):
+                        await self._log("info", f"Contenu '{ready_selector}' absent pour {url}")
                     return True
                 else:
-                    await safe_log("info", f"Réponse HTTP {response.status if response else 'None'} pour {url}")
+                    await self._log("info", f"Réponse HTTP {response.status if response else 'None'} pour {url}")
                     
             except Exception as e:
-                await safe_log("warning", f"Tentative {attempt + 1} échouée pour {url}: {e}")
+                await self._log("warning", f"Tentative {attempt + 1} échouée pour {url}: {e}")
                 if attempt == max_retries - 1:
                     return False
         
         return False
     
+    async def wait_for_products(self, page: Page, selector: str, timeout: int = 5000) -> bool:
+        """Attend qu'un conteneur de produits soit présent dans le DOM, au plus `timeout` ms."""
+        try:
+            await page.wait_for_selector(selector, state='attached', timeout=timeout)
+            return True
+        except PlaywrightTimeoutError:
+            await self._log("info", f"Aucun produit détecté après {timeout} ms")
+            return False
+    
     async def extract_products_from_page(self, page: Page, platform: str) -> List[Product]:
         """Extrait les produits d'une page en utilisant des sélecteurs spécifiques à la plateforme."""
         products = []
         
         try:
-            # Attendre que les produits se chargent
-            await page.wait_for_timeout(2000)
-            
             # Sélecteurs par plateforme
             selectors = self._get_platform_selectors(platform)
             
+            # Attendre que les produits se chargent
+            if selectors:
+                await self.wait_for_products(page, ', '.join(selectors))
+            
             # Extraction des produits
             for selector in selectors:
                 try:
                     elements = await page.query_selector_all(selector)
                     if elements:
-                        await safe_log("info", f"Trouvé {len(elements)} éléments avec le sélecteur {selector}")
+                        await self._log("info", f"Trouvé {len(elements)} éléments avec le sélecteur {selector}")
                         
                         for element in elements[:self.max_results]:
                             product = await self._extract_product_from_element(element, platform)
@@ -199,54 +308,38 @@ class PlaywrightScraper(BaseScraper):
                             break  # Utiliser le premier sélecteur qui fonctionne
                             
                 except Exception as e:
-                    await safe_log("error", f"Erreur avec le sélecteur {selector}: {e}")
+                    await self._log("error", f"Erreur avec le sélecteur {selector}: {e}")
                     continue
             
         except Exception as e:
-            await safe_log("error", f"Erreur lors de l'extraction des produits: {e}")
+            await self._log("error", f"Erreur lors de l'extraction des produits: {e}")
         
         return products[:self.max_results]
     
-    def _get_platform_selectors(self, platform: str) -> List[str]:
+    def _get_platform_selectors(self, platform: str) -> Tuple[str, ...]:
         """Retourne les sélecteurs CSS spécifiques à chaque plateforme."""
-        selectors_map = {
-            'amazon': [
-                'div[data-component-type="s-search-result"]',
-                'div[data-asin]:not([data-asin=""])',
-                '.s-result-item[data-asin]',
-                '[data-cel-widget="search_result"]'
-            ],
-            'ebay': [
-                '.s-item',
-                '.srp-results .s-item',
-                '[data-view="mi:1686|iid:1"]'
-            ],
-            'walmart': [
-                '[data-testid="item-stack"]',
-                '[data-automation-id="product-title"]',
-                '.mb0.ph1.pa0.bb.b--near-white.w-25'
-            ],
-            'etsy': [
-                '.v2-listing-card',
-                '.listing-link',
-                '[data-test-id="listing"]'
-            ]
-        }
-        
-        return selectors_map.get(platform.lower(), [])
+        return _SELECTORS_MAP.get(platform.lower(), ())
+    
+    async def _first_text(self, element, selector: str) -> str:
+        """Texte du premier sous-élément correspondant au sélecteur (chaîne vide sinon)."""
+        found = await element.query_selector(selector)
+        return await found.inner_text() if found else ""
+    
+    async def _first_attribute(self, element, selector: str, attribute: str) -> str:
+        """Attribut du premier sous-élément correspondant au sélecteur (chaîne vide sinon)."""
+        found = await element.query_selector(selector)
+        return (await found.get_attribute(attribute) or "") if found else ""
     
     async def _extract_product_from_element(self, element, platform: str) -> Optional[Product]:
         """Extrait les informations d'un produit à partir d'un élément DOM."""
         try:
             # Extraction basique - à adapter selon la plateforme
-            title_element = await element.query_selector('h2, h3, .s-title, [data-testid="product-title"], .listing-link')
-            title = await title_element.inner_text() if title_element else "Titre non trouvé"
-            
-            price_element = await element.query_selector('.a-price-whole, .s-price, .price, [data-testid="product-price"], .currency-value')
-            price = await price_element.inner_text() if price_element else "Prix non trouvé"
-            
-            link_element = await element.query_selector('a')
-            url = await link_element.get_attribute('href') if link_element else ""
+            # Les trois champs sont demandés simultanément sur le canal CDP
+            title, price, url = await asyncio.gather(
+                self._first_text(element, 'h2, h3, .s-title, [data-testid="product-title"], .listing-link'),
+                self._first_text(element, '.a-price-whole, .s-price, .price, [data-testid="product-price"], .currency-value'),
+                self._first_attribute(element, 'a', 'href')
+            )
             
             # Nettoyage et formatage
             title = title.strip()[:200] if title else "Titre non disponible"
@@ -271,11 +364,12 @@ class PlaywrightScraper(BaseScraper):
                 reviews_count="",
                 asin="",
                 availability="En stock",
+                platform=platform.lower(),
                 scraped_at=datetime.now()
             )
             
         except Exception as e:
-            await safe_log("error", f"Erreur lors de l'extraction du produit: {e}")
+            await self._log("error", f"Erreur lors de l'extraction du produit: {e}")
             return None
     
     async def close(self) -> None:
@@ -285,9 +379,17 @@ class PlaywrightScraper(BaseScraper):
                 await self.context.close()
             if self.browser:
                 await self.browser.close()
-            await safe_log("info", "Navigateur fermé avec succès")
+            if self._playwright:
+                await self._playwright.stop()
+            await self._log("info", "Navigateur fermé avec succès")
         except Exception as e:
-            await safe_log("error", f"Erreur lors de la fermeture du navigateur: {e}")
+            await self._log("error", f"Erreur lors de la fermeture du navigateur: {e}")
+        finally:
+            # Un prochain appel relancera un navigateur neuf (les pages du pool sont fermées avec le contexte)
+            self._page_pool = asyncio.Queue(maxsize=self.MAX_CONCURRENT_PAGES)
+            self.context = None
+            self.browser = None
+            self._playwright = None
     
     def get_platform_name(self) -> str:
         return "Playwright-Chromium"
@@ -1,8 +1,16 @@
 """Utilitaires partagés pour le projet."""
 
+import asyncio
+import time
+from typing import Awaitable, Callable
+
 from apify import Actor
 
 
+# Signature des fonctions de log injectables dans les scrapers
+LogFunc = Callable[[str, str], Awaitable[None]]
+
+
 async def safe_log(level: str, message: str):
     """Fonction utilitaire pour le logging sécurisé."""
     try:
@@ -23,4 +31,38 @@ async def safe_log(level: str, message: str):
         pass
     
     # Fallback vers print en cas d'erreur ou si Actor.log n'est pas disponible
-    print(f'[{level.upper()}] {message}')
\ No newline at end of file
+    print(f'[{level.upper()}] {message}')
+
+
+class TokenBucket:
+    """Limiteur de débit asynchrone à seau de jetons.
+    
+    Autorise des rafales jusqu'à `capacity` requêtes, puis un débit moyen
+    de `rate` requêtes par seconde. S'utilise avec `async with bucket:`.
+    """
+    
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self) -> None:
+        """Attend qu'un jeton soit disponible puis le consomme."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+    
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return False